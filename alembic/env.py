@@ -18,10 +18,15 @@ import app.model.user_role
 from app.model import permission
 from app.model import refresh_token
 from app.model import role_permission
+from app.model import login_throttle
+from app.model import role_hierarchy
 # импортируйте все модули с таблицами и моделями
 
-# Этот объект нужен Alembic для автогенерации миграций:
-target_metadata = Base.metadata
+# Этот объект нужен Alembic для автогенерации миграций.
+# refresh_tokens объявлена на отдельном Base: без его metadata автогенерация
+# считает таблицу лишней и предлагает её удалить
+from app.database.base import Base as TokenBase
+target_metadata = [Base.metadata, TokenBase.metadata]
 
 # Получаем конфиг Alembic
 config = context.config
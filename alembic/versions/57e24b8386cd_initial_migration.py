@@ -9,7 +9,6 @@ from typing import Sequence, Union
 
 from alembic import op
 import sqlalchemy as sa
-from sqlalchemy.dialects import postgresql
 
 # revision identifiers, used by Alembic.
 revision: str = '57e24b8386cd'
@@ -50,38 +49,42 @@ def upgrade() -> None:
     sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
     sa.PrimaryKeyConstraint('user_id', 'role_id')
     )
-    op.drop_index(op.f('ix_permissions_id'), table_name='permissions')
-    op.drop_table('permissions')
-    op.drop_table('refresh_tokens')
-    op.drop_table('role_permissions')
+    # Автогенерация шла по базе, где эти таблицы уже создал create_all, и вместо
+    # создания получились drop_*; на пустой базе цепочка миграций падала
+    op.create_table('permissions',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('resource', sa.String(length=50), nullable=False),
+    sa.Column('action', sa.String(length=50), nullable=False),
+    sa.Column('description', sa.String(length=255), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_permissions_id'), 'permissions', ['id'], unique=True)
+    op.create_table('role_permissions',
+    sa.Column('role_id', sa.UUID(), nullable=False),
+    sa.Column('permission_id', sa.UUID(), nullable=False),
+    sa.ForeignKeyConstraint(['permission_id'], ['permissions.id'], ),
+    sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ),
+    sa.PrimaryKeyConstraint('role_id', 'permission_id')
+    )
+    op.create_table('refresh_tokens',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('token', sa.String(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('revoked', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token', name=op.f('refresh_tokens_token_key'))
+    )
     # ### end Alembic commands ###
 
 
 def downgrade() -> None:
     """Downgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    op.create_table('role_permissions',
-    sa.Column('role_id', sa.UUID(), autoincrement=False, nullable=False),
-    sa.Column('permission_id', sa.UUID(), autoincrement=False, nullable=False),
-    sa.PrimaryKeyConstraint('role_id', 'permission_id', name=op.f('role_permissions_pkey'))
-    )
-    op.create_table('refresh_tokens',
-    sa.Column('id', sa.UUID(), autoincrement=False, nullable=False),
-    sa.Column('token', sa.VARCHAR(), autoincrement=False, nullable=False),
-    sa.Column('user_id', sa.UUID(), autoincrement=False, nullable=False),
-    sa.Column('created_at', postgresql.TIMESTAMP(), autoincrement=False, nullable=False),
-    sa.Column('revoked', sa.BOOLEAN(), autoincrement=False, nullable=False),
-    sa.PrimaryKeyConstraint('id', name=op.f('refresh_tokens_pkey')),
-    sa.UniqueConstraint('token', name=op.f('refresh_tokens_token_key'), postgresql_include=[], postgresql_nulls_not_distinct=False)
-    )
-    op.create_table('permissions',
-    sa.Column('id', sa.UUID(), autoincrement=False, nullable=False),
-    sa.Column('resource', sa.VARCHAR(length=50), autoincrement=False, nullable=False),
-    sa.Column('action', sa.VARCHAR(length=50), autoincrement=False, nullable=False),
-    sa.Column('description', sa.VARCHAR(length=255), autoincrement=False, nullable=True),
-    sa.PrimaryKeyConstraint('id', name=op.f('permissions_pkey'))
-    )
-    op.create_index(op.f('ix_permissions_id'), 'permissions', ['id'], unique=True)
+    op.drop_table('refresh_tokens')
+    op.drop_table('role_permissions')
+    op.drop_index(op.f('ix_permissions_id'), table_name='permissions')
+    op.drop_table('permissions')
     op.drop_table('user_roles')
     op.drop_index(op.f('ix_users_id'), table_name='users')
     op.drop_index(op.f('ix_users_email'), table_name='users')
@@ -0,0 +1,50 @@
+"""Add role hierarchy and closure table
+
+Revision ID: a7c9e1f3b468
+Revises: f6b8d0e2a357
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c9e1f3b468'
+down_revision: Union[str, Sequence[str], None] = 'f6b8d0e2a357'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('role_inheritance',
+    sa.Column('parent_id', sa.UUID(), nullable=False),
+    sa.Column('child_id', sa.UUID(), nullable=False),
+    sa.CheckConstraint('parent_id <> child_id', name='ck_role_inheritance_not_self'),
+    sa.ForeignKeyConstraint(['child_id'], ['roles.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['parent_id'], ['roles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('parent_id', 'child_id')
+    )
+    op.create_index('ix_role_inheritance_child_id', 'role_inheritance', ['child_id'], unique=False)
+    op.create_table('role_closure',
+    sa.Column('descendant_id', sa.UUID(), nullable=False),
+    sa.Column('ancestor_id', sa.UUID(), nullable=False),
+    sa.Column('paths', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['ancestor_id'], ['roles.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['descendant_id'], ['roles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('descendant_id', 'ancestor_id')
+    )
+    op.create_index('ix_role_closure_ancestor_id', 'role_closure', ['ancestor_id'], unique=False)
+    # Иерархии ещё нет: замыкание состоит только из строк (role, role)
+    op.execute("INSERT INTO role_closure (descendant_id, ancestor_id, paths) SELECT id, id, 1 FROM roles")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_role_closure_ancestor_id', table_name='role_closure')
+    op.drop_table('role_closure')
+    op.drop_index('ix_role_inheritance_child_id', table_name='role_inheritance')
+    op.drop_table('role_inheritance')
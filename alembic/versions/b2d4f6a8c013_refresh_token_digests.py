@@ -0,0 +1,48 @@
+"""Store refresh tokens as SHA-256 digests
+
+Revision ID: b2d4f6a8c013
+Revises: a1c3e5f7b901
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d4f6a8c013'
+down_revision: Union[str, Sequence[str], None] = 'a1c3e5f7b901'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('refresh_tokens', sa.Column('token_hash', sa.LargeBinary(length=32), nullable=True))
+    # sha256() встроена в PostgreSQL начиная с 11 версии
+    op.execute("UPDATE refresh_tokens SET token_hash = sha256(convert_to(token, 'UTF8'))")
+    op.alter_column('refresh_tokens', 'token_hash', nullable=False)
+    op.create_unique_constraint(op.f('refresh_tokens_token_hash_key'), 'refresh_tokens', ['token_hash'])
+    op.drop_constraint(op.f('refresh_tokens_token_key'), 'refresh_tokens', type_='unique')
+    op.drop_column('refresh_tokens', 'token')
+    op.create_index(
+        'ix_refresh_tokens_user_id_active',
+        'refresh_tokens',
+        ['user_id'],
+        unique=False,
+        postgresql_where=sa.text('revoked = false'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_refresh_tokens_user_id_active', table_name='refresh_tokens')
+    op.add_column('refresh_tokens', sa.Column('token', sa.VARCHAR(), nullable=True))
+    # Исходные токены по хешу не восстановить: сохраняем hex-представление и отзываем их
+    op.execute("UPDATE refresh_tokens SET token = encode(token_hash, 'hex'), revoked = true")
+    op.alter_column('refresh_tokens', 'token', nullable=False)
+    op.create_unique_constraint(op.f('refresh_tokens_token_key'), 'refresh_tokens', ['token'])
+    op.drop_constraint(op.f('refresh_tokens_token_hash_key'), 'refresh_tokens', type_='unique')
+    op.drop_column('refresh_tokens', 'token_hash')
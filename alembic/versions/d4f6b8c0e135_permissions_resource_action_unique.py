@@ -0,0 +1,44 @@
+"""Add unique constraint on permissions (resource, action)
+
+Revision ID: d4f6b8c0e135
+Revises: c3e5a7b9d024
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f6b8c0e135'
+down_revision: Union[str, Sequence[str], None] = 'c3e5a7b9d024'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Схлопываем дубликаты: связи ролей переносим на оставшееся право
+    op.execute("""
+        CREATE TEMPORARY TABLE permission_duplicates ON COMMIT DROP AS
+        SELECT id, first_value(id) OVER (PARTITION BY resource, action ORDER BY id) AS keep_id
+        FROM permissions
+    """)
+    op.execute("DELETE FROM permission_duplicates WHERE id = keep_id")
+    op.execute("""
+        INSERT INTO role_permissions (role_id, permission_id)
+        SELECT rp.role_id, d.keep_id
+        FROM role_permissions rp
+        JOIN permission_duplicates d ON d.id = rp.permission_id
+        ON CONFLICT DO NOTHING
+    """)
+    op.execute("DELETE FROM role_permissions WHERE permission_id IN (SELECT id FROM permission_duplicates)")
+    op.execute("DELETE FROM permissions WHERE id IN (SELECT id FROM permission_duplicates)")
+    op.create_unique_constraint('uq_permissions_resource_action', 'permissions', ['resource', 'action'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_permissions_resource_action', 'permissions', type_='unique')
@@ -0,0 +1,37 @@
+"""Add refresh_tokens.expires_at
+
+Revision ID: e5a7c9d1f246
+Revises: d4f6b8c0e135
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c9d1f246'
+down_revision: Union[str, Sequence[str], None] = 'd4f6b8c0e135'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Срок жизни refresh токена на момент миграции (settings.refresh_token_expire_days)
+REFRESH_TOKEN_EXPIRE_DAYS = 7
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('refresh_tokens', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    op.execute(
+        f"UPDATE refresh_tokens SET expires_at = created_at + interval '{REFRESH_TOKEN_EXPIRE_DAYS} days'"
+    )
+    op.alter_column('refresh_tokens', 'expires_at', nullable=False)
+    op.create_index(op.f('ix_refresh_tokens_expires_at'), 'refresh_tokens', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_refresh_tokens_expires_at'), table_name='refresh_tokens')
+    op.drop_column('refresh_tokens', 'expires_at')
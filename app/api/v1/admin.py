@@ -1,27 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 from app.schemas.role import RoleOut, RoleCreate, RoleUpdate
 from app.schemas.permission import PermissionOut, PermissionCreate, PermissionUpdate
+from app.schemas.assignment import UserRoleBulk, UserRoleResult, RolePermissionBulk, RolePermissionResult
 from app.crud.role import CRUDRole
+from app.crud.role_hierarchy import CRUDRoleHierarchy
 from app.crud.permission import CRUDPermission
 from app.crud.user_role import CRUDUserRole
 from app.crud.role_permission import CRUDRolePermission
-from app.database.session import get_db
+from app.crud.pagination import InvalidCursor, schema_columns
+from app.core.responses import page_response
+from app.model.role import Role
+from app.model.permission import Permission
+from app.schemas.pagination import Page
+from app.database.session import get_db, get_read_db
+from app.middleware.auth_middleware import required_roles
+from app.services.export_service import export_users
+from app.services.import_service import ImportEncodingError, import_users, iter_lines
+from app.schemas.user import UserImportReport
 
 router = APIRouter(prefix="/admin", tags=["Админка"])
 
+# Колонки для списков, сериализуемых напрямую из строк БД
+ROLE_COLUMNS = schema_columns(Role, RoleOut)
+PERMISSION_COLUMNS = schema_columns(Permission, PermissionOut)
+
 @router.post("/roles/", response_model=RoleOut)
 async def create_role(role_in: RoleCreate, db: AsyncSession = Depends(get_db)):
-    roles = await CRUDRole.get_all(db)
-    if any(r.name == role_in.name for r in roles):
+    role = await CRUDRole.create(db, role_in)
+    if role is None:
         raise HTTPException(status_code=400, detail="Role exists")
-    return await CRUDRole.create(db, role_in)
+    return role
 
-@router.get("/roles/", response_model=List[RoleOut])
-async def read_roles(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
-    return await CRUDRole.get_all(db, skip, limit)
+@router.get("/roles/", response_model=Page[RoleOut])
+async def read_roles(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), db: AsyncSession = Depends(get_read_db)):
+    try:
+        rows, next_cursor = await CRUDRole.get_page(db, cursor, limit, columns=ROLE_COLUMNS)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return page_response(rows, RoleOut.model_fields, next_cursor)
 
 @router.patch("/roles/{role_id}", response_model=RoleOut)
 async def update_role(role_id: UUID, role_in: RoleUpdate, db: AsyncSession = Depends(get_db)):
@@ -37,16 +57,40 @@ async def delete_role(role_id: UUID, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Role not found")
     await CRUDRole.delete(db, role)
 
+@router.get("/roles/{role_id}/ancestors", response_model=List[RoleOut])
+async def read_role_ancestors(role_id: UUID, db: AsyncSession = Depends(get_read_db)):
+    return await CRUDRoleHierarchy.get_ancestors(db, role_id)
+
+@router.post("/roles/{role_id}/parents/{parent_id}")
+async def add_role_parent(role_id: UUID, parent_id: UUID, db: AsyncSession = Depends(get_db)):
+    # role_id наследует права parent_id
+    result = await CRUDRoleHierarchy.add_parent(db, role_id, parent_id)
+    if result == "role_not_found":
+        raise HTTPException(status_code=404, detail="Role not found")
+    if result == "cycle":
+        raise HTTPException(status_code=409, detail="Role inheritance would create a cycle")
+    return {"detail": "Parent role added" if result == "added" else "Parent role already assigned"}
+
+@router.delete("/roles/{role_id}/parents/{parent_id}")
+async def remove_role_parent(role_id: UUID, parent_id: UUID, db: AsyncSession = Depends(get_db)):
+    if not await CRUDRoleHierarchy.remove_parent(db, role_id, parent_id):
+        raise HTTPException(status_code=404, detail="Role inheritance not found")
+    return {"detail": "Parent role removed"}
+
 @router.post("/permissions/", response_model=PermissionOut)
 async def create_permission(perm_in: PermissionCreate, db: AsyncSession = Depends(get_db)):
-    perms = await CRUDPermission.get_all(db)
-    if any(p.resource == perm_in.resource and p.action == perm_in.action for p in perms):
+    perm = await CRUDPermission.create(db, perm_in)
+    if perm is None:
         raise HTTPException(status_code=400, detail="Permission exists")
-    return await CRUDPermission.create(db, perm_in)
+    return perm
 
-@router.get("/permissions/", response_model=List[PermissionOut])
-async def read_permissions(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
-    return await CRUDPermission.get_all(db, skip, limit)
+@router.get("/permissions/", response_model=Page[PermissionOut])
+async def read_permissions(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), db: AsyncSession = Depends(get_read_db)):
+    try:
+        rows, next_cursor = await CRUDPermission.get_page(db, cursor, limit, columns=PERMISSION_COLUMNS)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return page_response(rows, PermissionOut.model_fields, next_cursor)
 
 @router.patch("/permissions/{perm_id}", response_model=PermissionOut)
 async def update_permission(perm_id: UUID, perm_in: PermissionUpdate, db: AsyncSession = Depends(get_db)):
@@ -81,3 +125,54 @@ async def add_permission_to_role(role_id: UUID, perm_id: UUID, db: AsyncSession
 async def remove_permission_from_role(role_id: UUID, perm_id: UUID, db: AsyncSession = Depends(get_db)):
     await CRUDRolePermission.remove_permission_from_role(db, role_id, perm_id)
     return {"detail": "Permission removed from role"}
+
+@router.post("/user-roles/bulk", response_model=List[UserRoleResult])
+async def add_roles_to_users(body: UserRoleBulk, db: AsyncSession = Depends(get_db)):
+    pairs = [(item.user_id, item.role_id) for item in body.items]
+    statuses = await CRUDUserRole.add_roles_to_users(db, pairs)
+    return [{"user_id": u, "role_id": r, "status": s} for (u, r), s in zip(pairs, statuses)]
+
+@router.delete("/user-roles/bulk", response_model=List[UserRoleResult])
+async def remove_roles_from_users(body: UserRoleBulk, db: AsyncSession = Depends(get_db)):
+    pairs = [(item.user_id, item.role_id) for item in body.items]
+    statuses = await CRUDUserRole.remove_roles_from_users(db, pairs)
+    return [{"user_id": u, "role_id": r, "status": s} for (u, r), s in zip(pairs, statuses)]
+
+@router.post("/role-permissions/bulk", response_model=List[RolePermissionResult])
+async def add_permissions_to_roles(body: RolePermissionBulk, db: AsyncSession = Depends(get_db)):
+    pairs = [(item.role_id, item.permission_id) for item in body.items]
+    statuses = await CRUDRolePermission.add_permissions_to_roles(db, pairs)
+    return [{"role_id": r, "permission_id": p, "status": s} for (r, p), s in zip(pairs, statuses)]
+
+@router.delete("/role-permissions/bulk", response_model=List[RolePermissionResult])
+async def remove_permissions_from_roles(body: RolePermissionBulk, db: AsyncSession = Depends(get_db)):
+    pairs = [(item.role_id, item.permission_id) for item in body.items]
+    statuses = await CRUDRolePermission.remove_permissions_from_roles(db, pairs)
+    return [{"role_id": r, "permission_id": p, "status": s} for (r, p), s in zip(pairs, statuses)]
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+@router.get("/users/export", dependencies=[Depends(required_roles(["admin"]))])
+async def export_users_stream(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    include_roles: bool = False,
+):
+    # Выгрузка всех пользователей потоком через серверный курсор, без пагинации
+    return StreamingResponse(
+        export_users(format, include_roles),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
+
+@router.post("/users/import", response_model=UserImportReport, dependencies=[Depends(required_roles(["admin"]))])
+async def import_users_bulk(
+    request: Request,
+    format: str = Query(..., pattern="^(csv|ndjson)$"),
+    method: str = Query("copy", pattern="^(copy|insert)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    # Тело читается потоком и обрабатывается пачками; ответ — отчёт по строкам с ошибками
+    try:
+        return await import_users(db, iter_lines(request.stream()), format, method)
+    except ImportEncodingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,44 +1,52 @@
-from uuid import UUID
+import secrets
+from uuid import UUID, uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import BaseModel
-from passlib.context import CryptContext
-from jose import jwt, JWTError
+from pydantic import BaseModel, Field
+from jose import JWTError
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 from app.crud.users import CRUDUser
 from app.database.session import get_db
 from app.schemas.user import UserCreate, UserOut
 from app.crud.refresh_token import CRUDRefreshToken
 from app.core.config import settings
+from app.core.security import encode_token, decode_token
+from app.services.password_service import verify_and_update_password
+from app.services.auth_service import ACCESS_TOKEN_USE, REFRESH_TOKEN_USE, TOKEN_USE_CLAIM, access_token_claims
+from app.services.introspection_service import introspect_tokens
+from app.services.throttle_service import enforce_login_throttle
 
 
-SECRET_KEY = settings.secret_key
-ALGORITHM = settings.algorithm
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
-ACCESS_TOKEN_EXPIRE_MINUTES = 15
-REFRESH_TOKEN_EXPIRE_DAYS = 7
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
 
-def create_access_token(data: dict):
-    return create_jwt_token(data, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    return create_jwt_token(
+        {**data, TOKEN_USE_CLAIM: ACCESS_TOKEN_USE},
+        expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
 
 def create_refresh_token(data: dict):
-    return create_jwt_token(data, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+    # jti делает токены уникальными даже при нескольких входах в одну секунду
+    return create_jwt_token(
+        {**data, "jti": uuid4().hex, TOKEN_USE_CLAIM: REFRESH_TOKEN_USE},
+        timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
 
 def create_jwt_token(data: dict, expires_delta: timedelta):
     to_encode = data.copy()
     expire = datetime.utcnow() + expires_delta
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return encode_token(to_encode)
 
 router = APIRouter(prefix="/auth", tags=["Аутентификация"])
 
 class Token(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str
 
 class TokenData(BaseModel):
@@ -48,31 +56,31 @@ class UserLogin(BaseModel):
     email: str
     password: str
 
-def verify_password(plain_password, hashed_password) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=15))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-
 @router.post("/register", response_model=UserOut)
 async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     existing_user = await CRUDUser.get_by_email(db, user_in.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email уже зарегистрирован")
     user = await CRUDUser.create(db, user_in)
+    if user is None:
+        raise HTTPException(status_code=400, detail="Email уже зарегистрирован")
     return user
 
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    await enforce_login_throttle(request, db, form_data.username)
     user = await CRUDUser.get_by_email(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверные данные")
+    verified, new_hash = await verify_and_update_password(form_data.password, user.hashed_password)
+    if not verified:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверные данные")
+    if new_hash and settings.password_rehash_on_login:
+        # Пароль известен только в момент входа: переводим хеш на текущую схему и стоимость
+        await CRUDUser.update_password_hash(db, user, new_hash)
 
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data=access_token_claims(user))
     refresh_token = create_refresh_token(data={"sub": user.email})
     await CRUDRefreshToken.create(db, token=refresh_token, user_id=UUID(str(user.id)))
 
@@ -90,19 +98,25 @@ class RefreshTokenRequest(BaseModel):
 async def refresh_token(body: RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
     # Проверяем валидность JWT
     try:
-        payload = jwt.decode(body.refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(body.refresh_token)
         email = payload.get("sub")
-        if email is None:
+        if email is None or payload.get(TOKEN_USE_CLAIM) != REFRESH_TOKEN_USE:
             raise HTTPException(status_code=401, detail="Невалидный refresh токен")
     except JWTError:
         raise HTTPException(status_code=401, detail="Невалидный refresh токен")
 
-    # Проверяем, что токен не отозван в базе
+    # Токен должен быть сохранён при входе и не отозван
     is_active = await CRUDRefreshToken.is_token_active(db, body.refresh_token)
     if not is_active:
         raise HTTPException(status_code=401, detail="Refresh токен отозван")
 
-    access_token = create_access_token(data={"sub": email})
+    if settings.stateless_auth:
+        user = await CRUDUser.get_by_email(db, email)
+        if user is None or not user.is_active:
+            raise HTTPException(status_code=401, detail="Невалидный refresh токен")
+        access_token = create_access_token(data=access_token_claims(user))
+    else:
+        access_token = create_access_token(data={"sub": email})
     return {"access_token": access_token, "token_type": "bearer"}
 
 class LogoutRequest(BaseModel):
@@ -113,4 +127,35 @@ async def logout(body: LogoutRequest, db: AsyncSession = Depends(get_db)):
     token_obj = await CRUDRefreshToken.get_by_token(db, body.refresh_token)
     if token_obj:
         await CRUDRefreshToken.revoke_token(db, token_obj)
-    return {"detail": "Успешный выход из системы"}
\ No newline at end of file
+    return {"detail": "Успешный выход из системы"}
+
+
+class IntrospectRequest(BaseModel):
+    tokens: List[str] = Field(..., min_length=1, max_length=1000)
+
+class IntrospectResponse(BaseModel):
+    results: List[dict]
+
+async def introspection_client(authorization: Optional[str] = Header(None)):
+    # Вызывающий сервис передаёт introspection_secret как Bearer; без секрета эндпоинт закрыт
+    expected = settings.introspection_secret
+    if not expected:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Token introspection is not configured",
+        )
+    scheme, _, credentials = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(credentials, expected):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid introspection client credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+@router.post("/introspect", response_model=IntrospectResponse)
+async def introspect(
+    body: IntrospectRequest,
+    db: AsyncSession = Depends(get_db),
+    _client: None = Depends(introspection_client),
+):
+    return {"results": await introspect_tokens(db, body.tokens)}
@@ -3,39 +3,53 @@ from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
-from app.database.session import get_db
+from app.database.session import RequestUnit, get_db, get_request_unit
 from app.model import User
 from app.crud.users import CRUDUser
 from app.schemas.user import UserOut
 from app.crud.refresh_token import CRUDRefreshToken
-
-SECRET_KEY = "your-secret-key"
-ALGORITHM = "HS256"
+from app.core.security import decode_token
+from app.services.permissions_service import has_any_permission
+from app.services.auth_service import REFRESH_TOKEN_USE, TOKEN_USE_CLAIM, principal_from_claims, authz_versions
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 class TokenData(UserOut):
     email: Optional[str] = None
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> UserOut:
+async def get_current_user(token: str = Depends(oauth2_scheme), unit: RequestUnit = Depends(get_request_unit)) -> UserOut:
+    # Пользователь уже найден другой зависимостью этого запроса
+    if unit.user is not None:
+        return unit.user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Невалидный токен аутентификации",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         email: str = payload.get("sub")
-        if email is None:
+        # Refresh токен не заменяет access токен
+        if email is None or payload.get(TOKEN_USE_CLAIM) == REFRESH_TOKEN_USE:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
+    # Быстрый путь: токен с актуальной версией авторизации не требует запросов к БД
+    principal = principal_from_claims(payload)
+    if principal is not None:
+        unit.user = principal
+        return principal
+
+    # Пользователь и отзыв токенов читаются с primary: реплика может не видеть
+    # свежий logout или смену ролей, а версия отсюда попадает в authz_versions
+    db = unit.session()
     # Получаем пользователя жадной загрузкой ролей
     result = await db.execute(
         select(User)
@@ -47,16 +61,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
         raise credentials_exception
 
     # Проверяем, что у пользователя есть неотозванный refresh токен
-    result_token = await db.execute(
-        select(CRUDRefreshToken.model).where(
-            CRUDRefreshToken.model.user_id == user.id,
-            CRUDRefreshToken.model.revoked == False  # поле revoked - bool
-        )
-    )
-    valid_token = result_token.scalars().first()
-    if not valid_token:
+    if not await CRUDRefreshToken.has_active_token(db, user.id):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
 
+    authz_versions.update(user.id, user.authz_version)
+    unit.user = user
     return user
 
 async def require_roles(
@@ -73,12 +82,11 @@ async def require_roles(
 
 async def require_permissions(
     permissions: List[str],
-    current_user: UserOut = Depends(get_current_user)
+    current_user: UserOut = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    user_permissions = set()
-    for role in current_user.roles:
-        user_permissions.update({perm.action for perm in role.permissions})
-    if not user_permissions.intersection(permissions):
+    # Права кэшируются, поэтому читаются с primary: отстающая реплика закэшировала бы старые
+    if not await has_any_permission(db, current_user.id, permissions):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Недостаточно прав: отсутствует необходимое право"
@@ -1,29 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 import uuid
 from app.schemas.role import RoleCreate, RoleUpdate, RoleOut
 from app.crud.role import CRUDRole
+from app.crud.pagination import InvalidCursor, schema_columns
+from app.core.responses import page_response
+from app.model.role import Role
+from app.schemas.pagination import Page
 from app.api.v1.dependencies import get_current_user, require_roles
-from app.database.session import get_db
+from app.database.session import get_db, get_read_db
 
 router = APIRouter(prefix="/api", tags=["Роли"])
 
+ROLE_COLUMNS = schema_columns(Role, RoleOut)
+
 async def admin_required(current_user=Depends(get_current_user)):
     has_access = await require_roles(["admin"], current_user)
     if not has_access:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Недостаточно прав")
     return current_user
 
-@router.get("/", response_model=List[RoleOut])
-async def read_roles(db: AsyncSession = Depends(get_db), current_user=Depends(admin_required)):
-    roles = await CRUDRole.get_all(db)
-    return roles
+@router.get("/", response_model=Page[RoleOut])
+async def read_roles(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    current_user=Depends(admin_required)
+):
+    try:
+        rows, next_cursor = await CRUDRole.get_page(db, cursor, limit, columns=ROLE_COLUMNS)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return page_response(rows, RoleOut.model_fields, next_cursor)
 
 @router.get("/{role_id}", response_model=RoleOut)
 async def read_role(
     role_id: uuid.UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user=Depends(admin_required)
 ):
     role = await CRUDRole.get(db, str(role_id))
@@ -38,6 +52,8 @@ async def create_role(
     current_user=Depends(admin_required)
 ):
     role = await CRUDRole.create(db, role_in)
+    if role is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Роль уже существует")
     return role
 
 @router.put("/{role_id}", response_model=RoleOut)
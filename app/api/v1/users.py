@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from app.database.session import get_db
+from app.database.session import get_db, get_read_db
 from app.schemas.user import UserBase, UserCreate, UserUpdate
 from app.crud.users import CRUDUser
-from app.core.config import (
+from app.crud.pagination import InvalidCursor, schema_columns
+from app.core.responses import page_response
+from app.model.user import User
+from app.schemas.pagination import Page
+from app.services.auth_service import TokenPrincipal
+from app.middleware.auth_middleware import (
     get_current_active_user,
     get_admin_user,
     can_manage_users,
@@ -15,35 +20,50 @@ from app.core.config import (
 
 router = APIRouter()
 
+# Списки отдаются строками из БД напрямую, без валидации каждого объекта через UserBase
+USER_COLUMNS = schema_columns(User, UserBase)
+
 
 # Только аутентифицированные пользователи
 @router.get("/me", response_model=UserBase)
-async def read_user_me(current_user: UserBase = Depends(get_current_active_user)):
+async def read_user_me(
+        current_user: UserBase = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_read_db)
+):
+    # В stateless режиме профиль в токене не хранится
+    if isinstance(current_user, TokenPrincipal):
+        current_user = await CRUDUser.get(db, current_user.id)
     return current_user
 
 
 # Только админы могут видеть всех пользователей
-@router.get("/", response_model=List[UserBase])
+@router.get("/", response_model=Page[UserBase])
 async def read_users(
-        skip: int = 0,
-        limit: int = 100,
-        db: AsyncSession = Depends(get_db),
-        admin_user: UserBase = Depends(get_admin_user)  # Проверка роли
+        cursor: Optional[str] = None,
+        limit: int = Query(100, ge=1, le=1000),
+        db: AsyncSession = Depends(get_read_db),
+        admin_user: UserBase = Depends(get_admin_user())  # Проверка роли
 ):
-    users = await CRUDUser.get_all(db, skip=skip, limit=limit)
-    return users
+    try:
+        rows, next_cursor = await CRUDUser.get_page(db, cursor=cursor, limit=limit, columns=USER_COLUMNS)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return page_response(rows, UserBase.model_fields, next_cursor)
 
 
 # Или с проверкой пермишенов
-@router.get("/with-permissions", response_model=List[UserBase])
+@router.get("/with-permissions", response_model=Page[UserBase])
 async def read_users_with_permissions(
-        skip: int = 0,
-        limit: int = 100,
-        db: AsyncSession = Depends(get_db),
-        authorized_user: UserBase = Depends(can_view_users)  # Проверка прав
+        cursor: Optional[str] = None,
+        limit: int = Query(100, ge=1, le=1000),
+        db: AsyncSession = Depends(get_read_db),
+        authorized_user: UserBase = Depends(can_view_users())  # Проверка прав
 ):
-    users = await CRUDUser.get_all(db, skip=skip, limit=limit)
-    return users
+    try:
+        rows, next_cursor = await CRUDUser.get_page(db, cursor=cursor, limit=limit, columns=USER_COLUMNS)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return page_response(rows, UserBase.model_fields, next_cursor)
 
 
 # Создание пользователя - только админы
@@ -51,7 +71,7 @@ async def read_users_with_permissions(
 async def create_user(
         user_in: UserCreate,
         db: AsyncSession = Depends(get_db),
-        admin_user: UserBase = Depends(get_admin_user)
+        admin_user: UserBase = Depends(get_admin_user())
 ):
     user = await CRUDUser.get_by_email(db, user_in.email)
     if user:
@@ -60,6 +80,11 @@ async def create_user(
             detail="The user with this email already exists",
         )
     user = await CRUDUser.create(db, user_in)
+    if user is None:
+        raise HTTPException(
+            status_code=400,
+            detail="The user with this email already exists",
+        )
     return user
 
 
@@ -67,7 +92,7 @@ async def create_user(
 @router.get("/{user_id}", response_model=UserBase)
 async def read_user(
         user_id: UUID,
-        db: AsyncSession = Depends(get_db),
+        db: AsyncSession = Depends(get_read_db),
         current_user: UserBase = Depends(get_current_active_user)
 ):
     user = await CRUDUser.get(db, user_id)
@@ -0,0 +1,64 @@
+"""Массовый импорт пользователей из CSV или NDJSON.
+
+    python -m app.cli.import_users users.csv
+    python -m app.cli.import_users users.ndjson --method insert --report report.json
+
+Колонки: first_name, last_name, middle_name, email, is_active и либо password,
+либо hashed_password (готовый bcrypt/argon2 хеш).
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import AsyncIterator
+
+from app.services.import_service import IMPORT_FORMATS, IMPORT_METHODS, ImportEncodingError, import_users, iter_lines
+from app.services.password_service import bulk_password_hasher
+
+READ_SIZE = 1 << 20
+
+
+async def read_chunks(path: Path) -> AsyncIterator[bytes]:
+    with path.open("rb") as f:
+        while chunk := f.read(READ_SIZE):
+            yield chunk
+
+
+async def main(args: argparse.Namespace) -> int:
+    from app.database.session import async_session, engine
+
+    path = Path(args.path)
+    fmt = args.format or ("csv" if path.suffix.lower() == ".csv" else "ndjson")
+    # Отдельный процесс: можно занять все ядра
+    workers = args.workers or os.cpu_count()
+    try:
+        async with bulk_password_hasher(workers) as hasher, async_session() as db:
+            report = await import_users(db, iter_lines(read_chunks(path)), fmt, args.method, hasher)
+    except ImportEncodingError as e:
+        print(f"{path}: {e}", file=sys.stderr)
+        return 2
+    finally:
+        await engine.dispose()
+
+    print(f"total={report.total} created={report.created} failed={report.failed}")
+    if args.report:
+        Path(args.report).write_text(report.model_dump_json(indent=2))
+    else:
+        for error in report.errors[:20]:
+            print(f"  row {error.row}: {error.status} {error.email or ''} {error.error or ''}", file=sys.stderr)
+    return 0 if report.failed == 0 else 1
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bulk user import")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="по умолчанию по расширению файла")
+    parser.add_argument("--method", choices=IMPORT_METHODS, default="copy")
+    parser.add_argument("--workers", type=int, help="процессов для хеширования паролей, по умолчанию по числу ядер")
+    parser.add_argument("--report", help="путь для JSON-отчёта")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -1,52 +1,110 @@
-from fastapi import Depends, HTTPException
-from app.middleware.auth_middleware import (
-    get_current_user,
-    required_roles,
-    required_permissions
-)
-from app.model.user import User
-
+from typing import List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     database_url: str
+    # Прямое подключение к Postgres в обход пулера (нужно для LISTEN при db_profile=pgbouncer)
+    database_direct_url: Optional[str] = None
+    # Реплики для чтения (JSON-список URL). Реплика с отставанием больше
+    # replica_max_lag_seconds или недоступная исключается, чтения идут на primary.
+    database_replica_urls: List[str] = []
+    replica_max_lag_seconds: float = 5.0
+    replica_check_interval_seconds: float = 5.0
     secret_key: str
     algorithm: str = "HS256"
+    # Для RS256/ES256: каталог с приватными ключами <kid>.pem и kid ключа подписи
+    jwt_keys_dir: Optional[str] = None
+    jwt_signing_kid: Optional[str] = None
+    jwks_cache_max_age_seconds: int = 300
+    # Бэкенд подписи JWT: auto, hmac, pyjwt, jose
+    jwt_backend: str = "auto"
+    # Секрет клиентов /auth/introspect; пока не задан, эндпоинт отвечает 503
+    introspection_secret: Optional[str] = None
     debug: bool = False
+
+    # Профиль движка БД: "dev", "prod" или "pgbouncer" (transaction mode, без кэша statements).
+    # В prod/pgbouncer пул каждого воркера — доля db_max_connections на workers.
+    db_profile: str = "dev"
+    workers: int = 4
+    db_max_connections: int = 80
+    db_pool_size: Optional[int] = None
+    db_max_overflow: Optional[int] = None
+    db_pool_timeout_seconds: float = 30
+    db_pool_recycle_seconds: int = 1800
+    db_echo: Optional[bool] = None
     access_token_expire_minutes: int = 15
     refresh_token_expire_days: int = 7
 
+    # Фоновая очистка истёкших и отозванных refresh токенов. С тем же интервалом
+    # чистятся корзины login_throttle_backend=postgres, даже если очистка токенов выключена
+    refresh_token_purge_enabled: bool = True
+    refresh_token_purge_interval_seconds: float = 3600
+    refresh_token_purge_batch_size: int = 1000
+    refresh_token_purge_pause_seconds: float = 0.1
+
+    # Кэш эффективных прав пользователей
+    permission_cache_ttl_seconds: float = 60.0
+    permission_cache_max_size: int = 10000
+
+    # Пул для хеширования паролей: "thread" или "process"
+    password_hash_executor: str = "thread"
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 64
+    password_hash_retry_after_seconds: int = 1
+    # "bcrypt" или "argon2" (требует argon2-cffi). Если password_hash_rounds не задан,
+    # стоимость подбирается при старте под password_hash_target_ms; в кластере лучше
+    # зафиксировать значение, чтобы все воркеры хешировали одинаково.
+    password_hash_scheme: str = "bcrypt"
+    password_hash_rounds: Optional[int] = None
+    password_hash_target_ms: float = 250.0
+    argon2_memory_cost_kib: int = 65536
+    argon2_parallelism: int = 2
+    password_rehash_on_login: bool = True
+    # HTTP-импорт: общий на воркер пул процессов для хеширования и лимит одновременных
+    # импортов (CLI по умолчанию берёт все ядра)
+    import_hash_workers: int = 2
+    import_max_concurrent: int = 1
+
+    # Ограничение попыток входа: token bucket по IP и по email ("memory" или "postgres")
+    login_throttle_enabled: bool = True
+    login_throttle_backend: str = "memory"
+    login_throttle_ip_burst: int = 20
+    login_throttle_ip_per_minute: float = 30
+    login_throttle_email_burst: int = 5
+    login_throttle_email_per_minute: float = 5
+    trust_forwarded_for: bool = False
+
+    # Аутентификация по claims access токена без запросов к БД
+    stateless_auth: bool = False
+    # Сколько версий авторизации помнит воркер; для вытесненных пользователей — проверка через БД
+    authz_version_cache_max_size: int = 100000
+
+    # Список отзыва в памяти воркера, синхронизируемый через LISTEN/NOTIFY: пока он
+    # загружен, отзыв refresh токенов и сессий проверяется без запросов к БД
+    revocation_listener_enabled: bool = True
+
+    # Проверка ревизии Alembic при старте: "error", "warn" или "off"
+    schema_check: str = "error"
+
     model_config = SettingsConfigDict(env_file=".env", extra="forbid")
 
 
 settings = Settings()
 
 
-# Базовые зависимости
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
-    if not current_user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
-
-
-# Ролевые зависимости
-def get_admin_user():
-    return required_roles(["admin"])
-
-
-def get_user():
-    return required_roles(["user", "admin"])
-
-
-# Пермишен-зависимости
-def can_manage_users():
-    return required_permissions(["users:write"])
-
 
-def can_view_users():
-    return required_permissions(["users:read"])
+# Зависимости авторизации живут в app.middleware.auth_middleware. Импорт из
+# app.core.config сохранён для совместимости, но выполняется лениво: модуль
+# настроек не должен тянуть за собой модели, CRUD и middleware.
+_AUTH_DEPENDENCIES = {
+    "get_current_active_user", "get_admin_user", "get_user",
+    "can_manage_users", "can_view_users", "can_manage_roles",
+}
 
 
-def can_manage_roles():
-    return required_permissions(["roles:write"])
+def __getattr__(name):
+    if name in _AUTH_DEPENDENCIES:
+        from app.middleware import auth_middleware
+        return getattr(auth_middleware, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,146 @@
+import bisect
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    # Минимальная реализация гистограммы в формате Prometheus (без внешних зависимостей).
+    # Значения хранятся в памяти процесса, каждый воркер отдаёт свои метрики.
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            # bucket counts + sum + count
+            series = self._series[label_values] = [0.0] * (len(self.buckets) + 2)
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self._series.items()):
+            base = [f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values)]
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = ",".join(base + [f'le="{_format(bound)}"'])
+                lines.append(f"{self.name}_bucket{{{labels}}} {_format(cumulative)}")
+            labels = ",".join(base + ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{{{labels}}} {_format(series[-1])}")
+            suffix = "{" + ",".join(base) + "}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {_format(series[-2])}")
+            lines.append(f"{self.name}_count{suffix} {_format(series[-1])}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+            f"{self.name} {_format(self.value)}",
+        ]
+
+
+class Gauge:
+    # Значение читается в момент отдачи /metrics (например, состояние пула соединений)
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._function: Optional[Callable[[], float]] = None
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def render(self) -> List[str]:
+        if self._function is None:
+            return []
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {_format(self._function())}",
+        ]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Total database time per HTTP request", ("method", "route"))
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Number of SQL statements per HTTP request", ("method", "route"), COUNT_BUCKETS)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection")
+POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts_total", "Connections checked out from the pool")
+POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total", "Pool checkouts that timed out waiting for a connection")
+POOL_SIZE = Gauge("db_pool_size", "Configured number of persistent pool connections")
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently in use")
+POOL_CHECKED_IN = Gauge("db_pool_checked_in", "Idle connections in the pool")
+POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections opened above pool_size (negative while the pool is filling)")
+
+REGISTRY = [
+    REQUEST_LATENCY, REQUEST_DB_TIME, REQUEST_DB_QUERIES, POOL_CHECKOUT_WAIT,
+    POOL_CHECKOUTS, POOL_TIMEOUTS, POOL_SIZE, POOL_CHECKED_OUT, POOL_CHECKED_IN, POOL_OVERFLOW,
+]
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+
+# Статистика SQL текущего запроса; выставляется middleware, заполняется событиями движка
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def record_query(statement: str, started: float) -> None:
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
@@ -0,0 +1,41 @@
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, Optional, Sequence
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson опционален
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    # orjson сам сериализует UUID и datetime; без него — stdlib json
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def page_response(rows: Iterable[Sequence[Any]], fields: Iterable[str], next_cursor: Optional[str]) -> FastJSONResponse:
+    # Строки БД сразу превращаются в JSON без создания и валидации pydantic-моделей.
+    # Колонки в строке идут в порядке fields, лишние (ключ курсора) отбрасываются.
+    fields = tuple(fields)
+    return FastJSONResponse({
+        "items": [dict(zip(fields, row)) for row in rows],
+        "next_cursor": next_cursor,
+    })
@@ -0,0 +1,277 @@
+import base64
+import calendar
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from jose import JWTError, jwk
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError
+
+
+def get_settings():
+    from app.core.config import settings
+    return settings
+
+
+class KeySet:
+    # Ключи подписи JWT. Для HS* используется settings.secret_key, для RS*/ES* —
+    # приватные ключи <kid>.pem из jwt_keys_dir: все они принимаются при проверке
+    # и публикуются в JWKS, подписывает только jwt_signing_kid.
+    def __init__(self, algorithm: str, secret_key: str, keys_dir: Optional[str] = None, signing_kid: Optional[str] = None):
+        self.algorithm = algorithm
+        self.symmetric = algorithm.startswith("HS")
+        self.private_keys: Dict[str, str] = {}
+        self.public_keys: Dict[str, dict] = {}
+
+        if self.symmetric:
+            self.signing_kid = None
+            self.signing_key = secret_key
+            return
+
+        if not keys_dir:
+            raise RuntimeError(f"jwt_keys_dir is required for {algorithm}")
+        paths = sorted(Path(keys_dir).glob("*.pem"), key=lambda p: p.stat().st_mtime)
+        if not paths:
+            raise RuntimeError(f"No *.pem keys found in {keys_dir}")
+        for path in paths:
+            kid = path.stem
+            pem = path.read_text()
+            self.private_keys[kid] = pem
+            public = jwk.construct(pem, algorithm).public_key().to_dict()
+            public.update({"kid": kid, "use": "sig", "alg": algorithm})
+            self.public_keys[kid] = public
+
+        # По умолчанию подписываем самым свежим ключом
+        self.signing_kid = signing_kid or paths[-1].stem
+        if self.signing_kid not in self.private_keys:
+            raise RuntimeError(f"Signing key {self.signing_kid} not found in {keys_dir}")
+        self.signing_key = self.private_keys[self.signing_kid]
+
+    def verification_key(self, kid: Optional[str]):
+        if self.symmetric:
+            return self.signing_key
+        key = self.public_keys.get(kid)
+        if key is None:
+            raise JWTError("Unknown key id")
+        return key
+
+    @property
+    def jwks(self) -> dict:
+        # Секрет HS* никогда не публикуется
+        keys: List[dict] = list(self.public_keys.values())
+        return {"keys": keys}
+
+
+class JoseBackend:
+    # Подпись через объекты ключей python-jose, построенные один раз
+    name = "jose"
+
+    def prepare(self, key, algorithm: str):
+        return jwk.construct(key, algorithm)
+
+    def sign(self, message: bytes, key) -> bytes:
+        return key.sign(message)
+
+    def verify(self, message: bytes, signature: bytes, key) -> bool:
+        return key.verify(message, signature)
+
+
+class HmacBackend:
+    # HS* напрямую через hmac из стандартной библиотеки
+    name = "hmac"
+    digests = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+    def prepare(self, key, algorithm: str):
+        return key.encode() if isinstance(key, str) else key, self.digests[algorithm]
+
+    def sign(self, message: bytes, key) -> bytes:
+        secret, digest = key
+        return hmac.new(secret, message, digest).digest()
+
+    def verify(self, message: bytes, signature: bytes, key) -> bool:
+        return hmac.compare_digest(self.sign(message, key), signature)
+
+
+class PyJWTBackend:
+    # Опциональный бэкенд на PyJWT + cryptography (pip install pyjwt[crypto])
+    name = "pyjwt"
+
+    def __init__(self):
+        from jwt.algorithms import get_default_algorithms
+        self._algorithms = get_default_algorithms()
+
+    def prepare(self, key, algorithm: str):
+        algo = self._algorithms[algorithm]
+        if isinstance(key, dict):
+            return algo, algo.from_jwk(json.dumps(key))
+        return algo, algo.prepare_key(key)
+
+    def sign(self, message: bytes, key) -> bytes:
+        algo, prepared = key
+        return algo.sign(message, prepared)
+
+    def verify(self, message: bytes, signature: bytes, key) -> bool:
+        algo, prepared = key
+        return algo.verify(message, prepared, signature)
+
+
+def get_backend(name: str, algorithm: str):
+    if name == "auto":
+        if algorithm.startswith("HS"):
+            return HmacBackend()
+        try:
+            return PyJWTBackend()
+        except ImportError:
+            return JoseBackend()
+    if name == "hmac":
+        return HmacBackend()
+    if name == "pyjwt":
+        return PyJWTBackend()
+    if name == "jose":
+        return JoseBackend()
+    raise RuntimeError(f"Unknown JWT backend: {name}")
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _timestamp(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    return value
+
+
+class TokenCodec:
+    # Кодирование/проверка JWT с подготовленными ключами и заранее
+    # сериализованным заголовком: на каждый токен остаются только JSON
+    # полезной нагрузки, base64 и сама подпись.
+    HEADER_CACHE_SIZE = 64
+
+    def __init__(self, key_set: KeySet, backend):
+        self.key_set = key_set
+        self.backend = backend
+        self.algorithm = key_set.algorithm
+        self._signing_key = backend.prepare(key_set.signing_key, self.algorithm)
+        if key_set.symmetric:
+            self._verification_keys = {None: self._signing_key}
+        else:
+            self._verification_keys = {
+                kid: backend.prepare(public, self.algorithm)
+                for kid, public in key_set.public_keys.items()
+            }
+
+        header = {"alg": self.algorithm, "typ": "JWT"}
+        if key_set.signing_kid:
+            header["kid"] = key_set.signing_kid
+        self._header_segment = _b64encode(json.dumps(header, separators=(",", ":")).encode())
+        self._headers: Dict[str, dict] = {self._header_segment.decode(): header}
+
+    def encode(self, claims: dict) -> str:
+        payload = {key: _timestamp(value) for key, value in claims.items()}
+        signing_input = self._header_segment + b"." + _b64encode(
+            json.dumps(payload, separators=(",", ":")).encode()
+        )
+        signature = self.backend.sign(signing_input, self._signing_key)
+        return (signing_input + b"." + _b64encode(signature)).decode()
+
+    def _header(self, segment: str) -> dict:
+        header = self._headers.get(segment)
+        if header is None:
+            try:
+                header = json.loads(_b64decode(segment))
+            except ValueError:
+                raise JWTError("Invalid header")
+            if not isinstance(header, dict):
+                raise JWTError("Invalid header")
+            if len(self._headers) < self.HEADER_CACHE_SIZE:
+                self._headers[segment] = header
+        return header
+
+    def decode(self, token: str) -> dict:
+        try:
+            header_segment, payload_segment, signature_segment = token.split(".")
+        except (AttributeError, ValueError):
+            raise JWTError("Not enough segments")
+        header = self._header(header_segment)
+        # Алгоритм фиксирован конфигурацией: защита от подмены alg в заголовке
+        if header.get("alg") != self.algorithm:
+            raise JWTError("The specified alg value is not allowed")
+
+        kid = None if self.key_set.symmetric else header.get("kid")
+        key = self._verification_keys.get(kid)
+        if key is None:
+            raise JWTError("Unknown key id")
+        try:
+            signature = _b64decode(signature_segment)
+            payload_bytes = _b64decode(payload_segment)
+        except ValueError:
+            raise JWTError("Invalid segment encoding")
+        signing_input = f"{header_segment}.{payload_segment}".encode()
+        if not self.backend.verify(signing_input, signature, key):
+            raise JWTError("Signature verification failed")
+
+        try:
+            claims = json.loads(payload_bytes)
+        except ValueError:
+            raise JWTError("Invalid payload")
+        if not isinstance(claims, dict):
+            raise JWTError("Invalid payload")
+        self._validate_times(claims)
+        return claims
+
+    @staticmethod
+    def _validate_times(claims: dict) -> None:
+        now = time.time()
+        if "exp" in claims:
+            try:
+                exp = int(claims["exp"])
+            except (TypeError, ValueError):
+                raise JWTClaimsError("Expiration Time claim (exp) must be an integer.")
+            if exp < now:
+                raise ExpiredSignatureError("Signature has expired.")
+        if "nbf" in claims:
+            try:
+                nbf = int(claims["nbf"])
+            except (TypeError, ValueError):
+                raise JWTClaimsError("Not Before claim (nbf) must be an integer.")
+            if nbf > now:
+                raise JWTClaimsError("The token is not yet valid (nbf)")
+
+
+_codec: Optional[TokenCodec] = None
+
+
+def get_codec() -> TokenCodec:
+    global _codec
+    if _codec is None:
+        settings = get_settings()
+        key_set = KeySet(
+            algorithm=settings.algorithm,
+            secret_key=settings.secret_key,
+            keys_dir=settings.jwt_keys_dir,
+            signing_kid=settings.jwt_signing_kid,
+        )
+        _codec = TokenCodec(key_set, get_backend(settings.jwt_backend, settings.algorithm))
+    return _codec
+
+
+def get_key_set() -> KeySet:
+    return get_codec().key_set
+
+
+def encode_token(claims: dict) -> str:
+    return get_codec().encode(claims)
+
+
+def decode_token(token: str) -> dict:
+    # Бросает JWTError для невалидной подписи, истёкшего токена или неизвестного kid
+    return get_codec().decode(token)
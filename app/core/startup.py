@@ -0,0 +1,38 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    # Длительность фаз старта воркера: логируется одной строкой и доступна в app.state
+    def __init__(self, started: Optional[float] = None):
+        self.started = started if started is not None else time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def mark(self, name: str, since: float) -> None:
+        self.phases[name] = time.perf_counter() - since
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name, started)
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def report(self) -> dict:
+        return {
+            "total_ms": round(self.total * 1000, 1),
+            "phases_ms": {name: round(elapsed * 1000, 1) for name, elapsed in self.phases.items()},
+        }
+
+    def log(self) -> None:
+        phases = ", ".join(f"{name}={elapsed * 1000:.1f}ms" for name, elapsed in self.phases.items())
+        logger.info("Startup completed in %.1fms (%s)", self.total * 1000, phases)
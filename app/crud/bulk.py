@@ -0,0 +1,27 @@
+from typing import Iterable, Iterator, List, Set, TypeVar
+
+from sqlalchemy import any_, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+T = TypeVar("T")
+
+# asyncpg ограничивает число параметров запроса 32767
+BULK_CHUNK_SIZE = 5000
+
+
+def chunked(items: List[T], size: int = BULK_CHUNK_SIZE) -> Iterator[List[T]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def existing_ids(db: AsyncSession, column, ids: Iterable) -> Set:
+    # Передаём весь список одним параметром-массивом: column = ANY(:ids)
+    ids = list(ids)
+    if not ids:
+        return set()
+    result = await db.execute(
+        select(column).where(column == any_(literal(ids, type_=ARRAY(column.type))))
+    )
+    return set(result.scalars().all())
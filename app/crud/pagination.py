@@ -0,0 +1,41 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else str(v) for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> Tuple[Any, ...]:
+    # Курсор непрозрачен для клиента: base64url(JSON) со значениями ключа сортировки
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise InvalidCursor(cursor)
+        return tuple(
+            datetime.fromisoformat(v) if t is datetime else UUID(v) if t is UUID else t(v)
+            for t, v in zip(types, values)
+        )
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def schema_columns(model, schema) -> List[Any]:
+    # Колонки модели в порядке полей схемы ответа: для выборки строк без ORM-объектов
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def split_page(rows: Sequence[Any], limit: int, key) -> Tuple[List[Any], Optional[str]]:
+    # Запрос выбирает limit + 1 строк: лишняя строка означает, что есть следующая страница
+    items = list(rows[:limit])
+    next_cursor = encode_cursor(*key(items[-1])) if len(rows) > limit else None
+    return items, next_cursor
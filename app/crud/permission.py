@@ -1,7 +1,12 @@
-from typing import Optional, List
+from typing import Any, Optional, List, Sequence, Tuple
+from uuid import UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.model.permission import Permission
+from app.crud.pagination import decode_cursor, split_page
+from app.services.permissions_service import CATALOG_CHANGED
+from app.services.revocation_service import apply_local, notify
 from app.schemas.permission import PermissionCreate, PermissionUpdate
 
 class CRUDPermission:
@@ -12,32 +17,54 @@ class CRUDPermission:
 
     @staticmethod
     async def get_all(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Permission]:
-        result = await db.execute(select(Permission).offset(skip).limit(limit))
+        result = await db.execute(select(Permission).order_by(Permission.id).offset(skip).limit(limit))
         return result.scalars().all()
 
     @staticmethod
-    async def create(db: AsyncSession, perm_in: PermissionCreate) -> Permission:
-        db_perm = Permission(
-            resource=perm_in.resource,
-            action=perm_in.action,
-            description=perm_in.description,
+    async def get_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100,
+                       columns: Optional[Sequence[Any]] = None) -> Tuple[List[Any], Optional[str]]:
+        # С columns возвращаются строки (columns..., id) вместо ORM-объектов
+        entities = [*columns, Permission.id] if columns else [Permission]
+        query = select(*entities).order_by(Permission.id).limit(limit + 1)
+        if cursor:
+            (last_id,) = decode_cursor(cursor, UUID)
+            query = query.where(Permission.id > last_id)
+        result = await db.execute(query)
+        rows = result.all() if columns else result.scalars().all()
+        return split_page(rows, limit, lambda perm: (perm.id,))
+
+    @staticmethod
+    async def create(db: AsyncSession, perm_in: PermissionCreate) -> Optional[Permission]:
+        # None, если право с такими resource и action уже существует
+        result = await db.execute(
+            pg_insert(Permission)
+            .values(
+                resource=perm_in.resource,
+                action=perm_in.action,
+                description=perm_in.description,
+            )
+            .on_conflict_do_nothing(constraint="uq_permissions_resource_action")
+            .returning(Permission)
         )
-        db.add(db_perm)
+        db_perm = result.scalar_one_or_none()
         await db.commit()
-        await db.refresh(db_perm)
         return db_perm
 
     @staticmethod
     async def update(db: AsyncSession, perm: Permission, perm_in: PermissionUpdate) -> Permission:
-        data = perm_in.dict(exclude_unset=True)
+        data = perm_in.model_dump(exclude_unset=True)
         for key, value in data.items():
             setattr(perm, key, value)
         db.add(perm)
+        await notify(db, [CATALOG_CHANGED])
         await db.commit()
+        apply_local([CATALOG_CHANGED])
         await db.refresh(perm)
         return perm
 
     @staticmethod
     async def delete(db: AsyncSession, perm: Permission) -> None:
         await db.delete(perm)
+        await notify(db, [CATALOG_CHANGED])
         await db.commit()
+        apply_local([CATALOG_CHANGED])
@@ -1,39 +1,102 @@
+import hashlib
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from datetime import datetime
+from datetime import datetime, timedelta
 import uuid
 from app.model.refresh_token import RefreshToken
+from app.model.user import User
+from app.services.auth_service import bump_authz_version
+from app.services.revocation_service import revocation_list, notify, apply_local, utc_timestamp
+
+def hash_token(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
 
 class CRUDRefreshToken:
     @staticmethod
-    async def create(db: AsyncSession, token: str, user_id: uuid.UUID) -> RefreshToken:
+    async def create(db: AsyncSession, token: str, user_id: uuid.UUID, expires_at: Optional[datetime] = None) -> RefreshToken:
+        from app.core.config import settings
+        now = datetime.utcnow()
+        # Блокировка строки пользователя упорядочивает вход с отзывом его последнего
+        # токена (см. revoke_token): user_active не обгонит user в NOTIFY
+        await db.execute(select(User.id).where(User.id == user_id).with_for_update(read=True))
         db_token = RefreshToken(
-            token=token,
+            token_hash=hash_token(token),
             user_id=user_id,
-            created_at=datetime.utcnow(),
+            created_at=now,
+            expires_at=expires_at or now + timedelta(days=settings.refresh_token_expire_days),
             revoked=False
         )
         db.add(db_token)
+        await db.flush()
+        messages = [f"user_active:{user_id}"]
+        await notify(db, messages)
         await db.commit()
+        apply_local(messages)
         await db.refresh(db_token)
         return db_token
 
     @staticmethod
     async def get_by_token(db: AsyncSession, token: str) -> Optional[RefreshToken]:
-        result = await db.execute(select(RefreshToken).where(RefreshToken.token == token))
+        result = await db.execute(select(RefreshToken).where(RefreshToken.token_hash == hash_token(token)))
         return result.scalar_one_or_none()
 
-    @staticmethod
-    async def revoke_token(db: AsyncSession, token: RefreshToken) -> None:
+    @classmethod
+    async def revoke_token(cls, db: AsyncSession, token: RefreshToken) -> None:
         token.revoked = True
         db.add(token)
+        await db.flush()
+        # UPDATE версии держит блокировку строки пользователя до commit: параллельные
+        # отзывы и входы того же пользователя ждут, и проверка ниже видит их результат
+        authz_messages = await bump_authz_version(db, token.user_id)
+        messages = [f"token:{token.token_hash.hex()}:{int(utc_timestamp(token.expires_at))}"]
+        if not await cls._query_active_token(db, token.user_id):
+            messages.append(f"user:{token.user_id}")
+        await notify(db, messages)
         await db.commit()
+        apply_local(authz_messages + messages)
 
     model = RefreshToken
 
     @classmethod
     async def is_token_active(cls, db: AsyncSession, token: str) -> bool:
-        result = await db.execute(select(cls.model).where(cls.model.token == token))
-        token_obj = result.scalars().first()
-        return token_obj is not None and not token_obj.revoked
+        # Подпись, exp и token_use=refresh проверяет вызывающий код. При готовом списке
+        # отзыва ответ из памяти: строки удаляются очисткой только после expires_at,
+        # а отзыв доходит до всех воркеров через NOTIFY
+        token_hash = hash_token(token)
+        if revocation_list.ready:
+            return not revocation_list.is_token_revoked(token_hash)
+        result = await db.execute(
+            select(cls.model.id).where(
+                cls.model.token_hash == token_hash,
+                cls.model.revoked == False,
+                cls.model.expires_at > datetime.utcnow(),
+            )
+        )
+        return result.first() is not None
+
+    @classmethod
+    async def has_active_token(cls, db: AsyncSession, user_id: uuid.UUID) -> bool:
+        # Из памяти: пользователь отозвал последний токен — запись живёт, пока могут
+        # действовать выданные ему access токены. После естественного истечения
+        # последнего refresh токена access токен доживает до своего exp, как и без
+        # списка отзыва
+        if revocation_list.ready:
+            return not revocation_list.is_user_logged_out(user_id)
+        # Без списка считается по существующим строкам: у пользователя без строк
+        # (в том числе после очистки) активной сессии нет
+        return await cls._query_active_token(db, user_id)
+
+    @classmethod
+    async def _query_active_token(cls, db: AsyncSession, user_id: uuid.UUID) -> bool:
+        # Использует частичный индекс ix_refresh_tokens_user_id_active
+        result = await db.execute(
+            select(cls.model.id)
+            .where(
+                cls.model.user_id == user_id,
+                cls.model.revoked == False,
+                cls.model.expires_at > datetime.utcnow(),
+            )
+            .limit(1)
+        )
+        return result.first() is not None
@@ -1,8 +1,15 @@
-from typing import Optional, List
+from typing import Any, Optional, List, Sequence, Tuple
+from uuid import UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.model.role import Role
+from app.crud.pagination import decode_cursor, split_page
+from app.services.permissions_service import USER_ROLES_CHANGED, invalidate_all_permissions, role_permission_messages
+from app.services.revocation_service import apply_local, notify
+from app.services.auth_service import bump_role_authz_versions
 from app.schemas.role import RoleCreate, RoleUpdate
+from app.crud.role_hierarchy import CRUDRoleHierarchy
 
 class CRUDRole:
     @staticmethod
@@ -12,31 +19,61 @@ class CRUDRole:
 
     @staticmethod
     async def get_all(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Role]:
-        result = await db.execute(select(Role).offset(skip).limit(limit))
+        result = await db.execute(select(Role).order_by(Role.id).offset(skip).limit(limit))
         return result.scalars().all()
 
     @staticmethod
-    async def create(db: AsyncSession, role_in: RoleCreate) -> Role:
-        db_role = Role(
-            name=role_in.name,
-            description=role_in.description,
+    async def get_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100,
+                       columns: Optional[Sequence[Any]] = None) -> Tuple[List[Any], Optional[str]]:
+        # С columns возвращаются строки (columns..., id) вместо ORM-объектов
+        entities = [*columns, Role.id] if columns else [Role]
+        query = select(*entities).order_by(Role.id).limit(limit + 1)
+        if cursor:
+            (last_id,) = decode_cursor(cursor, UUID)
+            query = query.where(Role.id > last_id)
+        result = await db.execute(query)
+        rows = result.all() if columns else result.scalars().all()
+        return split_page(rows, limit, lambda role: (role.id,))
+
+    @staticmethod
+    async def create(db: AsyncSession, role_in: RoleCreate) -> Optional[Role]:
+        # None, если роль с таким именем уже существует
+        result = await db.execute(
+            pg_insert(Role)
+            .values(
+                name=role_in.name,
+                description=role_in.description,
+            )
+            .on_conflict_do_nothing(index_elements=[Role.name])
+            .returning(Role)
         )
-        db.add(db_role)
+        db_role = result.scalar_one_or_none()
+        if db_role is not None:
+            await CRUDRoleHierarchy.add_self(db, db_role.id)
         await db.commit()
-        await db.refresh(db_role)
         return db_role
 
     @staticmethod
     async def update(db: AsyncSession, role: Role, role_in: RoleUpdate) -> Role:
-        data = role_in.dict(exclude_unset=True)
+        data = role_in.model_dump(exclude_unset=True)
         for key, value in data.items():
             setattr(role, key, value)
         db.add(role)
+        messages = await bump_role_authz_versions(db, role.id)
         await db.commit()
+        apply_local(messages)
+        invalidate_all_permissions()
         await db.refresh(role)
         return role
 
     @staticmethod
     async def delete(db: AsyncSession, role: Role) -> None:
+        authz_messages = await bump_role_authz_versions(db, role.id)
+        await CRUDRoleHierarchy.detach(db, role.id)
         await db.delete(role)
+        # Потомки роли теряют унаследованные права во всех воркерах
+        messages = role_permission_messages([role.id]) + [USER_ROLES_CHANGED]
+        await notify(db, messages)
         await db.commit()
+        apply_local(authz_messages + messages)
+        invalidate_all_permissions()
@@ -0,0 +1,150 @@
+from typing import List
+from uuid import UUID
+from sqlalchemy import delete as sqlalchemy_delete, func, or_, update as sqlalchemy_update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
+from app.model.role import Role
+from app.model.role_hierarchy import RoleClosure, RoleInheritance
+from app.crud.bulk import existing_ids
+from app.services.permissions_service import USER_ROLES_CHANGED
+from app.services.revocation_service import apply_local, notify
+
+# Изменения иерархии сериализуются: параллельные вставки рёбер могли бы образовать цикл
+ROLE_HIERARCHY_LOCK_KEY = 0x726F6C68  # "rolh"
+
+
+def _path_products(parent_id: UUID, child_id: UUID):
+    # Пары (предок parent, потомок child), которые связывает ребро parent → child,
+    # и число путей между ними через это ребро
+    ancestors = aliased(RoleClosure)
+    descendants = aliased(RoleClosure)
+    return (
+        select(
+            ancestors.ancestor_id,
+            descendants.descendant_id,
+            (ancestors.paths * descendants.paths).label("paths"),
+        )
+        .select_from(ancestors)
+        .join(descendants, descendants.ancestor_id == child_id)
+        .where(ancestors.descendant_id == parent_id)
+    )
+
+
+class CRUDRoleHierarchy:
+    @staticmethod
+    async def add_self(db: AsyncSession, role_id: UUID) -> None:
+        # Строка (role, role) нужна каждой роли: через неё пользователь получает саму роль
+        await db.execute(
+            pg_insert(RoleClosure)
+            .values(descendant_id=role_id, ancestor_id=role_id, paths=1)
+            .on_conflict_do_nothing()
+        )
+
+    @staticmethod
+    async def _lock(db: AsyncSession) -> None:
+        await db.execute(select(func.pg_advisory_xact_lock(ROLE_HIERARCHY_LOCK_KEY)))
+
+    @staticmethod
+    async def _link(db: AsyncSession, parent_id: UUID, child_id: UUID) -> None:
+        products = _path_products(parent_id, child_id)
+        stmt = pg_insert(RoleClosure).from_select(["ancestor_id", "descendant_id", "paths"], products)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[RoleClosure.descendant_id, RoleClosure.ancestor_id],
+                set_={"paths": RoleClosure.paths + stmt.excluded.paths},
+            )
+        )
+
+    @staticmethod
+    async def _unlink(db: AsyncSession, parent_id: UUID, child_id: UUID) -> None:
+        products = _path_products(parent_id, child_id).subquery()
+        await db.execute(
+            sqlalchemy_update(RoleClosure)
+            .where(
+                RoleClosure.ancestor_id == products.c.ancestor_id,
+                RoleClosure.descendant_id == products.c.descendant_id,
+            )
+            .values(paths=RoleClosure.paths - products.c.paths)
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            sqlalchemy_delete(RoleClosure)
+            .where(RoleClosure.paths <= 0)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def add_parent(db: AsyncSession, child_id: UUID, parent_id: UUID) -> str:
+        # Статусы: added, exists, role_not_found, cycle
+        if child_id == parent_id:
+            return "cycle"
+        await CRUDRoleHierarchy._lock(db)
+        if len(await existing_ids(db, Role.id, {child_id, parent_id})) != 2:
+            await db.rollback()
+            return "role_not_found"
+        cycle = await db.scalar(
+            select(RoleClosure.paths).where(
+                RoleClosure.descendant_id == parent_id, RoleClosure.ancestor_id == child_id
+            )
+        )
+        if cycle:
+            await db.rollback()
+            return "cycle"
+        result = await db.execute(
+            pg_insert(RoleInheritance)
+            .values(parent_id=parent_id, child_id=child_id)
+            .on_conflict_do_nothing()
+            .returning(RoleInheritance.child_id)
+        )
+        if result.scalar_one_or_none() is None:
+            await db.rollback()
+            return "exists"
+        await CRUDRoleHierarchy._link(db, parent_id, child_id)
+        await notify(db, [USER_ROLES_CHANGED])
+        await db.commit()
+        apply_local([USER_ROLES_CHANGED])
+        return "added"
+
+    @staticmethod
+    async def remove_parent(db: AsyncSession, child_id: UUID, parent_id: UUID) -> bool:
+        await CRUDRoleHierarchy._lock(db)
+        result = await db.execute(
+            sqlalchemy_delete(RoleInheritance)
+            .where(RoleInheritance.parent_id == parent_id, RoleInheritance.child_id == child_id)
+            .returning(RoleInheritance.child_id)
+            .execution_options(synchronize_session=False)
+        )
+        if result.scalar_one_or_none() is None:
+            await db.rollback()
+            return False
+        await CRUDRoleHierarchy._unlink(db, parent_id, child_id)
+        await notify(db, [USER_ROLES_CHANGED])
+        await db.commit()
+        apply_local([USER_ROLES_CHANGED])
+        return True
+
+    @staticmethod
+    async def detach(db: AsyncSession, role_id: UUID) -> None:
+        # Перед удалением роли: снимаем её рёбра с пересчётом замыкания, commit за вызывающим
+        await CRUDRoleHierarchy._lock(db)
+        result = await db.execute(
+            sqlalchemy_delete(RoleInheritance)
+            .where(or_(RoleInheritance.parent_id == role_id, RoleInheritance.child_id == role_id))
+            .returning(RoleInheritance.parent_id, RoleInheritance.child_id)
+            .execution_options(synchronize_session=False)
+        )
+        for parent_id, child_id in result.all():
+            await CRUDRoleHierarchy._unlink(db, parent_id, child_id)
+
+    @staticmethod
+    async def get_ancestors(db: AsyncSession, role_id: UUID) -> List[Role]:
+        # Все роли, права которых наследует role_id (без неё самой)
+        result = await db.execute(
+            select(Role)
+            .join(RoleClosure, RoleClosure.ancestor_id == Role.id)
+            .where(RoleClosure.descendant_id == role_id, RoleClosure.ancestor_id != role_id)
+            .order_by(Role.name)
+        )
+        return result.scalars().all()
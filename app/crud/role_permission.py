@@ -1,7 +1,14 @@
-from typing import List
+from typing import List, Tuple
+from sqlalchemy import delete as sqlalchemy_delete, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.model.role_permission import RolePermission
+from app.model.role import Role
+from app.model.permission import Permission
+from app.crud.bulk import chunked, existing_ids
+from app.services.permissions_service import role_permission_messages
+from app.services.revocation_service import apply_local, notify
 import uuid
 
 class CRUDRolePermission:
@@ -9,7 +16,10 @@ class CRUDRolePermission:
     async def add_permission_to_role(db: AsyncSession, role_id: uuid.UUID, perm_id: uuid.UUID):
         role_perm = RolePermission(role_id=role_id, permission_id=perm_id)
         db.add(role_perm)
+        messages = role_permission_messages([role_id])
+        await notify(db, messages)
         await db.commit()
+        apply_local(messages)
 
     @staticmethod
     async def remove_permission_from_role(db: AsyncSession, role_id: uuid.UUID, perm_id: uuid.UUID):
@@ -19,7 +29,10 @@ class CRUDRolePermission:
         role_perm = result.scalar_one_or_none()
         if role_perm:
             await db.delete(role_perm)
+            messages = role_permission_messages([role_id])
+            await notify(db, messages)
             await db.commit()
+            apply_local(messages)
 
     @staticmethod
     async def get_permissions_by_role(db: AsyncSession, role_id: uuid.UUID) -> List[uuid.UUID]:
@@ -27,3 +40,57 @@ class CRUDRolePermission:
             select(RolePermission.permission_id).where(RolePermission.role_id == role_id)
         )
         return [row[0] for row in result.all()]
+
+    @staticmethod
+    async def add_permissions_to_roles(db: AsyncSession, pairs: List[Tuple[uuid.UUID, uuid.UUID]]) -> List[str]:
+        # Все пары применяются в одной транзакции, для каждой возвращается статус
+        unique = list(dict.fromkeys(pairs))
+        roles = await existing_ids(db, Role.id, {role_id for role_id, _ in unique})
+        perms = await existing_ids(db, Permission.id, {perm_id for _, perm_id in unique})
+        valid = [(r, p) for r, p in unique if r in roles and p in perms]
+
+        added = set()
+        for chunk in chunked(valid):
+            result = await db.execute(
+                pg_insert(RolePermission)
+                .values([{"role_id": r, "permission_id": p} for r, p in chunk])
+                .on_conflict_do_nothing()
+                .returning(RolePermission.role_id, RolePermission.permission_id)
+            )
+            added.update((r, p) for r, p in result.all())
+
+        # Перечитываются маски только затронутых ролей
+        messages = role_permission_messages(r for r, _ in added)
+        await notify(db, messages)
+        await db.commit()
+        apply_local(messages)
+
+        def outcome(pair):
+            role_id, perm_id = pair
+            if role_id not in roles:
+                return "role_not_found"
+            if perm_id not in perms:
+                return "permission_not_found"
+            return "added" if pair in added else "exists"
+
+        return [outcome(pair) for pair in pairs]
+
+    @staticmethod
+    async def remove_permissions_from_roles(db: AsyncSession, pairs: List[Tuple[uuid.UUID, uuid.UUID]]) -> List[str]:
+        unique = list(dict.fromkeys(pairs))
+        removed = set()
+        for chunk in chunked(unique):
+            result = await db.execute(
+                sqlalchemy_delete(RolePermission)
+                .where(tuple_(RolePermission.role_id, RolePermission.permission_id).in_(chunk))
+                .returning(RolePermission.role_id, RolePermission.permission_id)
+                .execution_options(synchronize_session=False)
+            )
+            removed.update((r, p) for r, p in result.all())
+
+        messages = role_permission_messages(r for r, _ in removed)
+        await notify(db, messages)
+        await db.commit()
+        apply_local(messages)
+
+        return ["removed" if pair in removed else "not_found" for pair in pairs]
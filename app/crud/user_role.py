@@ -1,7 +1,15 @@
-from typing import List
+from typing import List, Tuple
+from sqlalchemy import delete as sqlalchemy_delete, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.model.user_role import UserRole
+from app.model.user import User
+from app.model.role import Role
+from app.crud.bulk import chunked, existing_ids
+from app.services.permissions_service import invalidate_user_permissions
+from app.services.auth_service import bump_authz_version, bump_authz_versions
+from app.services.revocation_service import apply_local
 import uuid
 
 class CRUDUserRole:
@@ -9,7 +17,10 @@ class CRUDUserRole:
     async def add_role_to_user(db: AsyncSession, user_id: uuid.UUID, role_id: uuid.UUID):
         user_role = UserRole(user_id=user_id, role_id=role_id)
         db.add(user_role)
+        messages = await bump_authz_version(db, user_id)
         await db.commit()
+        apply_local(messages)
+        invalidate_user_permissions(user_id)
 
     @staticmethod
     async def remove_role_from_user(db: AsyncSession, user_id: uuid.UUID, role_id: uuid.UUID):
@@ -19,4 +30,64 @@ class CRUDUserRole:
         user_role = result.scalar_one_or_none()
         if user_role:
             await db.delete(user_role)
+            messages = await bump_authz_version(db, user_id)
             await db.commit()
+            apply_local(messages)
+            invalidate_user_permissions(user_id)
+
+    @staticmethod
+    async def add_roles_to_users(db: AsyncSession, pairs: List[Tuple[uuid.UUID, uuid.UUID]]) -> List[str]:
+        # Все пары применяются в одной транзакции, для каждой возвращается статус
+        unique = list(dict.fromkeys(pairs))
+        users = await existing_ids(db, User.id, {user_id for user_id, _ in unique})
+        roles = await existing_ids(db, Role.id, {role_id for _, role_id in unique})
+        valid = [(u, r) for u, r in unique if u in users and r in roles]
+
+        added = set()
+        for chunk in chunked(valid):
+            result = await db.execute(
+                pg_insert(UserRole)
+                .values([{"user_id": u, "role_id": r} for u, r in chunk])
+                .on_conflict_do_nothing()
+                .returning(UserRole.user_id, UserRole.role_id)
+            )
+            added.update((u, r) for u, r in result.all())
+
+        affected_users = {u for u, _ in added}
+        messages = await bump_authz_versions(db, affected_users)
+        await db.commit()
+        apply_local(messages)
+        for user_id in affected_users:
+            invalidate_user_permissions(user_id)
+
+        def outcome(pair):
+            user_id, role_id = pair
+            if user_id not in users:
+                return "user_not_found"
+            if role_id not in roles:
+                return "role_not_found"
+            return "added" if pair in added else "exists"
+
+        return [outcome(pair) for pair in pairs]
+
+    @staticmethod
+    async def remove_roles_from_users(db: AsyncSession, pairs: List[Tuple[uuid.UUID, uuid.UUID]]) -> List[str]:
+        unique = list(dict.fromkeys(pairs))
+        removed = set()
+        for chunk in chunked(unique):
+            result = await db.execute(
+                sqlalchemy_delete(UserRole)
+                .where(tuple_(UserRole.user_id, UserRole.role_id).in_(chunk))
+                .returning(UserRole.user_id, UserRole.role_id)
+                .execution_options(synchronize_session=False)
+            )
+            removed.update((u, r) for u, r in result.all())
+
+        affected_users = {u for u, _ in removed}
+        messages = await bump_authz_versions(db, affected_users)
+        await db.commit()
+        apply_local(messages)
+        for user_id in affected_users:
+            invalidate_user_permissions(user_id)
+
+        return ["removed" if pair in removed else "not_found" for pair in pairs]
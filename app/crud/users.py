@@ -1,15 +1,27 @@
 from uuid import UUID
 from sqlalchemy.orm import selectinload
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import update as sqlalchemy_update
 from sqlalchemy import delete as sqlalchemy_delete
-from typing import Optional, List
+from typing import Any, Optional, List, Sequence, Set, Tuple
+from datetime import datetime
+from sqlalchemy import text, tuple_
 from app.model.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from passlib.context import CryptContext
+from app.crud.pagination import decode_cursor, split_page
+from app.crud.bulk import chunked
+from app.services.password_service import hash_password
+from app.services.auth_service import bump_authz_version
+from app.services.revocation_service import apply_local
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Колонки массовой вставки; порядок важен для COPY
+IMPORT_COLUMNS = (
+    "id", "first_name", "last_name", "middle_name", "email",
+    "hashed_password", "is_active", "authz_version", "created_at", "updated_at",
+)
 
 
 class CRUDUser:
@@ -30,28 +42,86 @@ class CRUDUser:
 
     @staticmethod
     async def get_all(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[User]:
-        result = await db.execute(select(User).offset(skip).limit(limit))
+        result = await db.execute(select(User).order_by(User.created_at, User.id).offset(skip).limit(limit))
         return result.scalars().all()
 
     @staticmethod
-    async def create(db: AsyncSession, user_in: UserCreate) -> User:
-        hashed_password = pwd_context.hash(user_in.password)
-        db_user = User(
-            first_name=user_in.first_name,
-            last_name=user_in.last_name,
-            middle_name=user_in.middle_name,
-            email=user_in.email,
-            hashed_password=hashed_password,
-            is_active=True,
+    async def get_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100,
+                       columns: Optional[Sequence[Any]] = None) -> Tuple[List[Any], Optional[str]]:
+        # Keyset-пагинация по индексу (created_at, id).
+        # С columns возвращаются строки (columns..., created_at, id) вместо ORM-объектов.
+        entities = [*columns, User.created_at, User.id] if columns else [User]
+        query = select(*entities).order_by(User.created_at, User.id).limit(limit + 1)
+        if cursor:
+            created_at, user_id = decode_cursor(cursor, datetime, UUID)
+            query = query.where(tuple_(User.created_at, User.id) > tuple_(created_at, user_id))
+        result = await db.execute(query)
+        rows = result.all() if columns else result.scalars().all()
+        return split_page(rows, limit, lambda user: (user.created_at, user.id))
+
+    @staticmethod
+    async def create(db: AsyncSession, user_in: UserCreate) -> User | None:
+        # None, если пользователь с таким email уже существует
+        hashed_password = await hash_password(user_in.password)
+        result = await db.execute(
+            pg_insert(User)
+            .values(
+                first_name=user_in.first_name,
+                last_name=user_in.last_name,
+                middle_name=user_in.middle_name,
+                email=user_in.email,
+                hashed_password=hashed_password,
+                is_active=True,
+            )
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User)
         )
-        db.add(db_user)
+        db_user = result.scalar_one_or_none()
         await db.commit()
-        await db.refresh(db_user)
         return db_user
 
+    @staticmethod
+    async def bulk_insert(db: AsyncSession, rows: List[dict], method: str = "copy") -> Set[str]:
+        # Вставляет готовые строки (все IMPORT_COLUMNS), пропуская занятые email.
+        # Возвращает email вставленных строк; commit остаётся за вызывающим.
+        if not rows:
+            return set()
+        if method == "insert":
+            inserted: Set[str] = set()
+            # 10 параметров на строку: пачки по 2000 укладываются в лимит asyncpg
+            for chunk in chunked(rows, 2000):
+                result = await db.execute(
+                    pg_insert(User).values(chunk)
+                    .on_conflict_do_nothing(index_elements=[User.email])
+                    .returning(User.email)
+                )
+                inserted.update(result.scalars().all())
+            return inserted
+        if method != "copy":
+            raise ValueError(f"Unknown import method: {method}")
+
+        # COPY во временную таблицу, затем один INSERT ... SELECT с ON CONFLICT:
+        # COPY сам по себе не умеет пропускать конфликтующие строки
+        columns = ", ".join(IMPORT_COLUMNS)
+        await db.execute(text(
+            "CREATE TEMP TABLE user_import (LIKE users INCLUDING DEFAULTS) ON COMMIT DROP"
+        ))
+        connection = await db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            "user_import",
+            records=[tuple(row[column] for column in IMPORT_COLUMNS) for row in rows],
+            columns=IMPORT_COLUMNS,
+        )
+        result = await db.execute(text(
+            f"INSERT INTO users ({columns}) SELECT {columns} FROM user_import "
+            "ON CONFLICT (email) DO NOTHING RETURNING email"
+        ))
+        return set(result.scalars().all())
+
     @staticmethod
     async def update(db: AsyncSession, user: User, user_in: UserUpdate) -> User:
-        data = user_in.dict(exclude_unset=True)
+        data = user_in.model_dump(exclude_unset=True)
         for key, value in data.items():
             setattr(user, key, value)
         db.add(user)
@@ -59,10 +129,23 @@ class CRUDUser:
         await db.refresh(user)
         return user
 
+    @staticmethod
+    async def update_password_hash(db: AsyncSession, user: User, new_hash: str) -> None:
+        # Условие на старый хеш: параллельная смена пароля не перезаписывается
+        await db.execute(
+            sqlalchemy_update(User)
+            .where(User.id == user.id, User.hashed_password == user.hashed_password)
+            .values(hashed_password=new_hash)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
     @staticmethod
     async def soft_delete(db: AsyncSession, user: User) -> None:
         user.is_active = False
         db.add(user)
+        messages = await bump_authz_version(db, user.id)
         await db.commit()
+        apply_local(messages)
 
 
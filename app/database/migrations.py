@@ -0,0 +1,50 @@
+import logging
+from pathlib import Path
+from typing import Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+class SchemaMismatch(RuntimeError):
+    pass
+
+
+def head_revisions() -> Set[str]:
+    # Импорт alembic только здесь: на обычный импорт приложения он не влияет
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    return set(ScriptDirectory.from_config(Config(str(ALEMBIC_INI))).get_heads())
+
+
+async def current_revisions(engine: AsyncEngine) -> Set[str]:
+    async with engine.connect() as conn:
+        try:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+        except ProgrammingError:
+            # Таблицы alembic_version нет: миграции не применялись
+            return set()
+        return set(result.scalars().all())
+
+
+async def check_schema_revision(engine: AsyncEngine, mode: str = "error") -> Optional[Set[str]]:
+    # Только чтение: DDL выполняет `alembic upgrade head` в шаге деплоя, а не каждый воркер
+    if mode == "off":
+        return None
+    expected = head_revisions()
+    current = await current_revisions(engine)
+    if current != expected:
+        message = (
+            f"Database schema revision {sorted(current) or 'none'} does not match "
+            f"migrations head {sorted(expected)}; run `alembic upgrade head`"
+        )
+        if mode == "error":
+            raise SchemaMismatch(message)
+        logger.warning(message)
+    return current
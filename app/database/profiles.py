@@ -0,0 +1,51 @@
+from typing import Tuple
+from uuid import uuid4
+
+PROFILES = ("dev", "prod", "pgbouncer")
+
+
+def pool_sizing(budget: int, workers: int, reserved_per_worker: int = 0) -> Tuple[int, int]:
+    # Делим общий лимит соединений между воркерами: pool_size + max_overflow на воркер
+    # не превышает его долю за вычетом выделенных соединений (LISTEN и т.п.)
+    per_worker = max(1, budget // max(1, workers) - reserved_per_worker)
+    pool_size = max(1, per_worker * 3 // 4)
+    return pool_size, per_worker - pool_size
+
+
+def _prepared_statement_name() -> str:
+    # Уникальные имена: за пулером следующий запрос может попасть на другое соединение
+    return f"__asyncpg_{uuid4()}__"
+
+
+def engine_options(settings) -> dict:
+    profile = settings.db_profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown database profile: {profile}")
+
+    if profile == "dev":
+        pool_size, max_overflow = 5, 5
+    else:
+        # Отдельное соединение на воркер держит слушатель LISTEN/NOTIFY
+        reserved = 1 if settings.revocation_listener_enabled else 0
+        pool_size, max_overflow = pool_sizing(settings.db_max_connections, settings.workers, reserved)
+    if settings.db_pool_size is not None:
+        pool_size = settings.db_pool_size
+    if settings.db_max_overflow is not None:
+        max_overflow = settings.db_max_overflow
+
+    options = {
+        "echo": settings.db_echo if settings.db_echo is not None else (profile == "dev" and settings.debug),
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": profile != "pgbouncer",
+    }
+    if profile == "pgbouncer":
+        # В transaction mode prepared statements asyncpg не переживают смену серверного соединения
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": _prepared_statement_name,
+        }
+    return options
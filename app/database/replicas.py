@@ -0,0 +1,91 @@
+import asyncio
+import itertools
+import logging
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Отставание реплики в секундах; 0, если всё полученное WAL уже применено
+# (на простаивающем primary pg_last_xact_replay_timestamp не меняется)
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    def __init__(self, engine: AsyncEngine, session_factory: async_sessionmaker):
+        self.engine = engine
+        self.session_factory = session_factory
+        # До первой проверки реплика не используется
+        self.healthy = False
+        self.lag: Optional[float] = None
+
+
+class ReplicaSet:
+    # Реплики для чтения с round-robin по здоровым; без них — primary.
+    # Состояние обновляет фоновая проверка раз в check_interval секунд.
+    def __init__(self, replicas: List[Replica], primary_factory: async_sessionmaker,
+                 max_lag: float = 5.0, check_interval: float = 5.0):
+        self.replicas = replicas
+        self.primary_factory = primary_factory
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def session_factory(self) -> async_sessionmaker:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return self.primary_factory
+        return healthy[next(self._counter) % len(healthy)].session_factory
+
+    async def _check(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as conn:
+                replica.lag = float(await conn.scalar(LAG_QUERY))
+            healthy = replica.lag <= self.max_lag
+        except Exception as e:
+            replica.lag = None
+            healthy = False
+            if replica.healthy:
+                logger.warning("Replica %s is down: %s", replica.engine.url.host, e)
+        if healthy != replica.healthy and replica.lag is not None:
+            logger.info("Replica %s %s (lag %.1fs)", replica.engine.url.host,
+                        "is back in rotation" if healthy else "lags, falling back", replica.lag)
+        replica.healthy = healthy
+
+    async def check(self) -> None:
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Replica health check failed")
+            await asyncio.sleep(self.check_interval)
+
+    async def start(self) -> None:
+        if self.replicas and self._task is None:
+            await self.check()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
@@ -1,23 +1,70 @@
+import time
+from typing import Any, Optional
+from fastapi import Depends
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.database.base import Base
 from app.core.config import settings
+from app.core.metrics import (
+    POOL_CHECKED_IN, POOL_CHECKED_OUT, POOL_CHECKOUT_WAIT, POOL_CHECKOUTS, POOL_OVERFLOW,
+    POOL_SIZE, POOL_TIMEOUTS, record_query,
+)
+from app.database.profiles import engine_options
+from app.database.replicas import Replica, ReplicaSet
 
 DATABASE_URL = settings.database_url
 
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    # Замеряет ожидание свободного соединения (включая открытие нового)
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        else:
+            POOL_CHECKOUTS.inc()
+            return connection
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+
+# Параметры пула и драйвера зависят от профиля: dev, prod или pgbouncer
 engine = create_async_engine(
     settings.database_url,
-    echo=True,
-    pool_size=10,
-    max_overflow=20,
-    pool_recycle=1800,
-    pool_pre_ping=True
+    poolclass=InstrumentedQueuePool,
+    **engine_options(settings),
 )
 
-@event.listens_for(engine.sync_engine, "connect")
-def do_connect(dbapi_connection, connection_record):
-    # Дополнительная конфигурация соединения при необходимости
-    pass
+POOL_SIZE.set_function(engine.pool.size)
+POOL_CHECKED_OUT.set_function(engine.pool.checkedout)
+POOL_CHECKED_IN.set_function(engine.pool.checkedin)
+POOL_OVERFLOW.set_function(engine.pool.overflow)
+
+
+def instrument(engine) -> None:
+    # Время и число SQL-запросов для метрик запроса; вешается на primary и реплики
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record_query(statement, conn.info["query_start_time"].pop())
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(exception_context):
+        # Упавший запрос не дойдёт до after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_time"):
+            conn.info["query_start_time"].pop()
+
+
+instrument(engine)
 
 async_session = async_sessionmaker(
     bind=engine,
@@ -25,10 +72,65 @@ async_session = async_sessionmaker(
     class_=AsyncSession,
 )
 
-async def get_db():
-    async with async_session() as session:
-        yield session
 
-async def get_db() -> AsyncSession:
-    async with async_session() as session:
-        yield session
+def _replica(url: str) -> Replica:
+    replica_engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, **engine_options(settings))
+    instrument(replica_engine)
+    return Replica(replica_engine, async_sessionmaker(bind=replica_engine, expire_on_commit=False, class_=AsyncSession))
+
+
+replicas = ReplicaSet(
+    [_replica(url) for url in settings.database_replica_urls],
+    async_session,
+    max_lag=settings.replica_max_lag_seconds,
+    check_interval=settings.replica_check_interval_seconds,
+)
+
+
+class RequestUnit:
+    # Всё, что зависимости одного запроса делят между собой: не больше одной сессии
+    # primary и одной сессии чтения (создаются при первом обращении) и пользователь,
+    # найденный по токену. Закрывается один раз, когда запрос завершён.
+    def __init__(self):
+        self._session: Optional[AsyncSession] = None
+        self._read_session: Optional[AsyncSession] = None
+        self.user: Any = None
+
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = async_session()
+        return self._session
+
+    def read_session(self) -> AsyncSession:
+        # Если primary уже открыт, читаем через него: лишнее соединение не нужно,
+        # и запрос видит собственные записи
+        if self._session is not None:
+            return self._session
+        if self._read_session is None:
+            self._read_session = replicas.session_factory()()
+        return self._read_session
+
+    async def close(self) -> None:
+        sessions = [s for s in (self._read_session, self._session) if s is not None]
+        self._session = self._read_session = None
+        self.user = None
+        for session in sessions:
+            await session.close()
+
+
+async def get_request_unit():
+    # FastAPI кэширует зависимость в пределах запроса: все get_db/get_read_db получают один unit
+    unit = RequestUnit()
+    try:
+        yield unit
+    finally:
+        await unit.close()
+
+async def get_db(unit: RequestUnit = Depends(get_request_unit)) -> AsyncSession:
+    return unit.session()
+
+async def get_read_db(unit: RequestUnit = Depends(get_request_unit)) -> AsyncSession:
+    # Сессия только для чтения: реплика, если есть здоровая, иначе primary.
+    # Данные могут отставать на replica_max_lag_seconds — не использовать перед записью
+    # и для чтений, результат которых кэшируется.
+    return unit.read_session()
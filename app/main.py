@@ -1,35 +1,97 @@
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI, Depends
-from app.database.session import engine, Base
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.session import engine, get_read_db, replicas
+from app.database.migrations import check_schema_revision
 from app.api.v1.dependencies import get_current_user
+from app.crud.users import CRUDUser
+from app.services.auth_service import TokenPrincipal
 from app.api.v1 import auth, users, admin, roles
+from app.services.password_service import init_password_hasher, shutdown_password_hasher
+from app.core.config import settings
+from app.core.metrics import render_metrics
+from app.core.security import get_key_set
+from app.core.startup import StartupTimer
+from app.core.responses import FastJSONResponse
+from app.middleware.metrics_middleware import MetricsMiddleware
+from app.services.revocation_service import start_revocation_listener, stop_revocation_listener
+from app.services.token_cleanup_service import start_token_purger, stop_token_purger
+
 
+_IMPORTS_DONE = time.perf_counter()
 
-async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    timer = StartupTimer(started=_IMPORT_STARTED)
+    timer.phases["imports"] = _IMPORTS_DONE - _IMPORT_STARTED
+    # Ошибки конфигурации ключей JWT должны всплывать при старте, а не на первом запросе
+    with timer.phase("jwt_keys"):
+        get_key_set()
+    with timer.phase("password_hasher"):
+        await init_password_hasher()
+    # Вместо create_all в каждом воркере — только проверка, что миграции применены
+    with timer.phase("schema_check"):
+        await check_schema_revision(engine, settings.schema_check)
+    with timer.phase("replicas"):
+        await replicas.start()
+    with timer.phase("revocation_listener"):
+        await start_revocation_listener()
+    with timer.phase("token_purger"):
+        await start_token_purger()
+    app.state.startup = timer.report()
+    timer.log()
+    try:
+        yield
+    finally:
+        await stop_token_purger()
+        await stop_revocation_listener()
+        await replicas.stop()
+        shutdown_password_hasher()
 
 app = FastAPI(
     title="Проект FastAPI с RBAC",
     version="1.0.0",
-    description="API для аутентификации, авторизации и управления ролями"
+    description="API для аутентификации, авторизации и управления ролями",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
+# Число SQL-запросов и время БД в заголовках ответа только в debug
+app.add_middleware(MetricsMiddleware, debug_headers=settings.debug)
+
 
 app.include_router(admin.router)  # → /admin/roles/, /admin/permissions/
 app.include_router(users.router)  # → /api/users/
 app.include_router(roles.router)  # → /api/roles/
 app.include_router(auth.router)    # → /auth/register, /auth/login
 
-@app.on_event("startup")
-async def startup_event():
-    await init_db()
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/.well-known/jwks.json", include_in_schema=False)
+async def jwks():
+    # Публичные ключи для локальной проверки access токенов другими сервисами
+    return JSONResponse(
+        get_key_set().jwks,
+        headers={"Cache-Control": f"public, max-age={settings.jwks_cache_max_age_seconds}"},
+    )
 
 @app.get("/me")
-async def read_current_user(current_user=Depends(get_current_user)):
+async def read_current_user(current_user=Depends(get_current_user), db: AsyncSession = Depends(get_read_db)):
+    if isinstance(current_user, TokenPrincipal):
+        current_user = await CRUDUser.get(db, current_user.id)
     return current_user
 
 if __name__ == "__main__":
     import multiprocessing
     multiprocessing.freeze_support()  # для Windows
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, workers=4)
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, workers=settings.workers)
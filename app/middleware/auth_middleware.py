@@ -1,13 +1,17 @@
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
+from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from typing import List
 
 from app.crud.users import CRUDUser
+from app.database.session import RequestUnit, get_db, get_request_unit
 from app.model.user import User
 from app.crud.refresh_token import CRUDRefreshToken
+from app.core.security import decode_token
+from app.services.permissions_service import has_any_permission
+from app.services.auth_service import REFRESH_TOKEN_USE, TOKEN_USE_CLAIM, principal_from_claims, authz_versions
 
 def get_settings():
     from app.core.config import settings
@@ -17,13 +21,11 @@ security = HTTPBearer()
 
 async def get_current_user(
         credentials: HTTPAuthorizationCredentials = Depends(security),
-        db: AsyncSession = Depends(lambda: None),
-        settings = Depends(get_settings)
+        unit: RequestUnit = Depends(get_request_unit),
 ) -> User:
-    # Отложенный импорт get_db внутри функции для избежания циклов
-    from app.database.session import get_db
-    if db is None:
-        db = await get_db().__anext__()
+    # Пользователь уже найден другой зависимостью этого запроса
+    if unit.user is not None:
+        return unit.user
 
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -32,33 +34,34 @@ async def get_current_user(
     )
 
     try:
-        payload = jwt.decode(
-            credentials.credentials,
-            settings.secret_key,
-            algorithms=[settings.algorithm]
-        )
+        payload = decode_token(credentials.credentials)
         email: str = payload.get("sub")
-        if email is None:
+        # Refresh токен не заменяет access токен
+        if email is None or payload.get(TOKEN_USE_CLAIM) == REFRESH_TOKEN_USE:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
+    # Быстрый путь: токен с актуальной версией авторизации не требует запросов к БД
+    principal = principal_from_claims(payload)
+    if principal is not None:
+        unit.user = principal
+        return principal
+
+    # Сессия запроса: закрывается вместе с unit, а не остаётся висеть в пуле.
+    # Primary, а не реплика: отставшая реплика пропустила бы отозванный токен
+    db = unit.session()
     user = await CRUDUser.get_by_email(db, email)
     if user is None:
         raise credentials_exception
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
 
-    result = await db.execute(
-        select(CRUDRefreshToken.model).where(
-            CRUDRefreshToken.model.user_id == user.id,
-            CRUDRefreshToken.model.revoked == False
-        )
-    )
-    valid_token = result.scalars().first()
-    if valid_token is None:
+    if not await CRUDRefreshToken.has_active_token(db, user.id):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
 
+    authz_versions.update(user.id, user.authz_version)
+    unit.user = user
     return user
 
 def required_roles(required_roles: List[str]):
@@ -77,17 +80,9 @@ def required_roles(required_roles: List[str]):
 def required_permissions(required_permissions: List[str]):
     async def permission_checker(
             current_user: User = Depends(get_current_user),
-            db: AsyncSession = Depends(lambda: __import__('app.database.session').session.get_db())
+            db: AsyncSession = Depends(get_db)
     ):
-        if callable(db):
-            db = await db()
-        user_permissions = []
-        for role in current_user.roles:
-            for role_perm in role.role_permissions:
-                permission = f"{role_perm.permission.resource}:{role_perm.permission.action}"
-                user_permissions.append(permission)
-
-        if not any(perm in user_permissions for perm in required_permissions):
+        if not await has_any_permission(db, current_user.id, required_permissions):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Insufficient permissions"
@@ -101,3 +96,32 @@ def admin_required():
 
 def user_required():
     return required_roles(["user", "admin"])
+
+
+# Базовые зависимости
+async def get_current_active_user(current_user: User = Depends(get_current_user)):
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
+
+# Ролевые зависимости
+def get_admin_user():
+    return required_roles(["admin"])
+
+
+def get_user():
+    return required_roles(["user", "admin"])
+
+
+# Пермишен-зависимости
+def can_manage_users():
+    return required_permissions(["users:write"])
+
+
+def can_view_users():
+    return required_permissions(["users:read"])
+
+
+def can_manage_roles():
+    return required_permissions(["roles:write"])
@@ -0,0 +1,62 @@
+import time
+
+from app.core.metrics import (
+    REQUEST_DB_QUERIES,
+    REQUEST_DB_TIME,
+    REQUEST_LATENCY,
+    QueryStats,
+    current_query_stats,
+)
+
+SLOWEST_STATEMENT_HEADER_LIMIT = 200
+
+
+class MetricsMiddleware:
+    # Чистое ASGI middleware: без накладных расходов BaseHTTPMiddleware
+    def __init__(self, app, debug_headers: bool = False):
+        self.app = app
+        self.debug_headers = debug_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.debug_headers:
+                    headers = list(message.get("headers", []))
+                    headers.extend(self._debug_headers(stats))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
+            # Шаблон маршрута вместо сырого пути, чтобы не раздувать число серий
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_LATENCY.observe(time.perf_counter() - started, method, route_path, str(status_code))
+            REQUEST_DB_TIME.observe(stats.total_time, method, route_path)
+            REQUEST_DB_QUERIES.observe(stats.count, method, route_path)
+
+    @staticmethod
+    def _debug_headers(stats: QueryStats):
+        headers = [
+            (b"x-db-query-count", str(stats.count).encode()),
+            (b"x-db-time-ms", f"{stats.total_time * 1000:.2f}".encode()),
+            (b"x-db-slowest-ms", f"{stats.slowest_time * 1000:.2f}".encode()),
+        ]
+        if stats.slowest_statement:
+            statement = " ".join(stats.slowest_statement.split())[:SLOWEST_STATEMENT_HEADER_LIMIT]
+            headers.append((b"x-db-slowest-statement", statement.encode("latin-1", "replace")))
+        return headers
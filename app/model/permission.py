@@ -2,7 +2,7 @@ import uuid
 from typing import Optional, TYPE_CHECKING
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import String
+from sqlalchemy import String, UniqueConstraint
 from app.model.base import Base
 
 if TYPE_CHECKING:
@@ -20,3 +20,7 @@ class Permission(Base):
 
     # Отношение через ассоциативную модель
     role_permissions: Mapped[list["RolePermission"]] = relationship("RolePermission", back_populates="permission")
+
+    __table_args__ = (
+        UniqueConstraint("resource", "action", name="uq_permissions_resource_action"),
+    )
@@ -1,6 +1,7 @@
 
 import uuid
 from datetime import datetime
+from sqlalchemy import Index, LargeBinary, text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from app.database.session import Base
@@ -9,7 +10,17 @@ class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
 
     id: Mapped[uuid.UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    token: Mapped[str] = mapped_column(nullable=False, unique=True)
+    # SHA-256 от текста токена, сам токен в БД не хранится
+    token_hash: Mapped[bytes] = mapped_column(LargeBinary(32), nullable=False, unique=True)
     user_id: Mapped[uuid.UUID] = mapped_column(PGUUID(as_uuid=True), nullable=False)
     created_at: Mapped[datetime] = mapped_column(nullable=False, default=datetime.utcnow)
+    expires_at: Mapped[datetime] = mapped_column(nullable=False, index=True)
     revoked: Mapped[bool] = mapped_column(nullable=False, default=False)
+
+    __table_args__ = (
+        Index(
+            "ix_refresh_tokens_user_id_active",
+            "user_id",
+            postgresql_where=text("revoked = false"),
+        ),
+    )
@@ -0,0 +1,41 @@
+import uuid
+from sqlalchemy import BigInteger, CheckConstraint, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.model.base import Base
+
+
+class RoleInheritance(Base):
+    # Ребро иерархии: child_id наследует права parent_id
+    __tablename__ = "role_inheritance"
+
+    parent_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True
+    )
+    child_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    __table_args__ = (
+        CheckConstraint("parent_id <> child_id", name="ck_role_inheritance_not_self"),
+        Index("ix_role_inheritance_child_id", "child_id"),
+    )
+
+
+class RoleClosure(Base):
+    # Транзитивное замыкание иерархии, включая строку (role, role) для каждой роли.
+    # paths — число путей ancestor → descendant: позволяет удалять рёбра в DAG
+    # инкрементально, без пересчёта замыкания целиком.
+    __tablename__ = "role_closure"
+
+    descendant_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True
+    )
+    ancestor_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True
+    )
+    paths: Mapped[int] = mapped_column(BigInteger, nullable=False, default=1)
+
+    __table_args__ = (
+        Index("ix_role_closure_ancestor_id", "ancestor_id"),
+    )
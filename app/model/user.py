@@ -4,7 +4,7 @@ from typing import Optional
 from datetime import datetime
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import String, Boolean, DateTime
+from sqlalchemy import String, Boolean, DateTime, Integer, Index
 
 from app.model.base import Base
 
@@ -19,6 +19,8 @@ class User(Base):
     email: Mapped[str] = mapped_column(String, unique=True, nullable=False, index=True)
     hashed_password: Mapped[str] = mapped_column(String, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # Увеличивается при изменении ролей/статуса, попадает в access токен как claim "av"
+    authz_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -27,3 +29,7 @@ class User(Base):
         secondary="user_roles",  # строка, имя таблицы
         back_populates="users"
     )
+
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
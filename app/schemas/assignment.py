@@ -0,0 +1,32 @@
+from typing import List
+from uuid import UUID
+from pydantic import BaseModel, Field
+
+# Ограничение размера одного bulk-запроса
+MAX_BULK_ITEMS = 100_000
+
+
+class UserRoleAssignment(BaseModel):
+    user_id: UUID
+    role_id: UUID
+
+
+class RolePermissionAssignment(BaseModel):
+    role_id: UUID
+    permission_id: UUID
+
+
+class UserRoleBulk(BaseModel):
+    items: List[UserRoleAssignment] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class RolePermissionBulk(BaseModel):
+    items: List[RolePermissionAssignment] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class UserRoleResult(UserRoleAssignment):
+    status: str
+
+
+class RolePermissionResult(RolePermissionAssignment):
+    status: str
@@ -1,6 +1,6 @@
 from typing import Optional
 from uuid import UUID
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 class PermissionBase(BaseModel):
     resource: str = Field(..., min_length=1, max_length=50)
@@ -11,12 +11,11 @@ class PermissionCreate(PermissionBase):
     pass
 
 class PermissionUpdate(BaseModel):
-    resource: Optional[str]
-    action: Optional[str]
-    description: Optional[str]
+    resource: Optional[str] = None
+    action: Optional[str] = None
+    description: Optional[str] = None
 
 class PermissionOut(PermissionBase):
-    id: UUID
+    model_config = ConfigDict(from_attributes=True)
 
-    class Config:
-        orm_mode = True
+    id: UUID
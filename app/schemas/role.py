@@ -1,6 +1,6 @@
 from typing import Optional
 from uuid import UUID
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 class RoleBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=50)
@@ -10,11 +10,10 @@ class RoleCreate(RoleBase):
     pass
 
 class RoleUpdate(BaseModel):
-    name: Optional[str]
-    description: Optional[str]
+    name: Optional[str] = None
+    description: Optional[str] = None
 
 class RoleOut(RoleBase):
-    id: UUID
+    model_config = ConfigDict(from_attributes=True)
 
-    class Config:
-        orm_mode = True
+    id: UUID
@@ -1,10 +1,12 @@
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, model_validator
 
 
 class UserBase(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     first_name: str
     last_name: str
     middle_name: Optional[str] = None
@@ -14,9 +16,9 @@ class UserCreate(UserBase):
     password: str = Field(..., min_length=6)
 
 class UserUpdate(BaseModel):
-    first_name: Optional[str]
-    last_name: Optional[str]
-    middle_name: Optional[str]
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    middle_name: Optional[str] = None
 
 class UserOut(UserBase):
     id: UUID
@@ -24,5 +26,34 @@ class UserOut(UserBase):
     created_at: datetime
     updated_at: datetime
 
-    class MyModel(BaseModel):
-        model_config = ConfigDict(from_attributes=True)
+
+class UserImportRow(BaseModel):
+    # Строка импорта: либо пароль в открытом виде, либо готовый bcrypt/argon2 хеш
+    first_name: str = Field(..., min_length=1)
+    last_name: str = Field(..., min_length=1)
+    middle_name: Optional[str] = None
+    email: EmailStr
+    password: Optional[str] = Field(None, min_length=6)
+    hashed_password: Optional[str] = None
+    is_active: bool = True
+
+    @model_validator(mode="after")
+    def check_password(self):
+        if (self.password is None) == (self.hashed_password is None):
+            raise ValueError("exactly one of password or hashed_password is required")
+        return self
+
+
+class UserImportError(BaseModel):
+    row: int
+    email: Optional[str] = None
+    status: str
+    error: Optional[str] = None
+
+
+class UserImportReport(BaseModel):
+    total: int = 0
+    created: int = 0
+    failed: int = 0
+    errors: List[UserImportError] = []
+    errors_truncated: bool = False
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+from sqlalchemy import any_, literal
+from sqlalchemy import update as sqlalchemy_update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.model.user import User
+from app.model.user_role import UserRole
+from app.services.revocation_service import notify
+
+
+def get_settings():
+    from app.core.config import settings
+    return settings
+
+
+# Назначение токена: refresh токен не принимается вместо access, и наоборот
+TOKEN_USE_CLAIM = "token_use"
+ACCESS_TOKEN_USE = "access"
+REFRESH_TOKEN_USE = "refresh"
+
+
+class TokenRole(BaseModel):
+    name: str
+
+
+class TokenPrincipal(BaseModel):
+    # Пользователь, восстановленный из claims access токена без обращения к БД
+    id: UUID
+    email: str
+    roles: List[TokenRole]
+    is_active: bool = True
+
+
+class AuthzVersionRegistry:
+    # Последние известные воркеру версии авторизации пользователей (LRU).
+    # Токен с версией ниже известной считается устаревшим и проверяется через БД.
+    # Неизвестный пользователь (новый воркер или вытесненная запись) тоже идёт
+    # через БД: там версия и попадает в реестр.
+    def __init__(self, maxsize: Optional[int] = None):
+        self._maxsize = maxsize
+        self._versions: "OrderedDict[UUID, int]" = OrderedDict()
+
+    @property
+    def maxsize(self) -> int:
+        if self._maxsize is None:
+            self._maxsize = get_settings().authz_version_cache_max_size
+        return self._maxsize
+
+    def get(self, user_id: UUID) -> Optional[int]:
+        return self._versions.get(user_id)
+
+    def update(self, user_id: UUID, version: int) -> None:
+        if version > self._versions.get(user_id, -1):
+            self._versions[user_id] = version
+        if user_id in self._versions:
+            self._versions.move_to_end(user_id)
+        while len(self._versions) > self.maxsize:
+            self._versions.popitem(last=False)
+
+    def is_stale(self, user_id: UUID, version: int) -> bool:
+        known = self._versions.get(user_id)
+        if known is None:
+            return True
+        self._versions.move_to_end(user_id)
+        return version < known
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+
+authz_versions = AuthzVersionRegistry()
+
+
+def access_token_claims(user: User) -> dict:
+    claims = {"sub": user.email}
+    if get_settings().stateless_auth:
+        claims.update({
+            "uid": str(user.id),
+            "roles": [role.name for role in user.roles],
+            "av": user.authz_version,
+        })
+    return claims
+
+
+def principal_from_claims(payload: dict) -> Optional[TokenPrincipal]:
+    if not get_settings().stateless_auth:
+        return None
+    try:
+        email = payload["sub"]
+        user_id = UUID(payload["uid"])
+        version = int(payload["av"])
+        roles = [TokenRole(name=name) for name in payload["roles"]]
+    except (KeyError, TypeError, ValueError):
+        return None
+    if authz_versions.is_stale(user_id, version):
+        return None
+    return TokenPrincipal(id=user_id, email=email, roles=roles)
+
+
+async def bump_authz_version(db: AsyncSession, user_id: UUID) -> List[str]:
+    # Вызывается до commit в той же транзакции, что и изменение прав пользователя.
+    # Возвращает сообщения для apply_local после commit: при откате транзакции
+    # реестр не должен узнать о версии, которой нет в БД
+    return await bump_authz_versions(db, [user_id])
+
+
+async def bump_authz_versions(db: AsyncSession, user_ids: Iterable[UUID]) -> List[str]:
+    user_ids = list(user_ids)
+    if not user_ids:
+        return []
+    return await _bump_where(db, User.id == any_(literal(user_ids, type_=ARRAY(User.id.type))))
+
+
+async def bump_role_authz_versions(db: AsyncSession, role_id: UUID) -> List[str]:
+    return await _bump_where(db, User.id.in_(select(UserRole.user_id).where(UserRole.role_id == role_id)))
+
+
+async def _bump_where(db: AsyncSession, criteria) -> List[str]:
+    result = await db.execute(
+        sqlalchemy_update(User)
+        .where(criteria)
+        .values(authz_version=User.authz_version + 1)
+        .returning(User.id, User.authz_version)
+        .execution_options(synchronize_session=False)
+    )
+    messages = [f"authz:{user_id}:{version}" for user_id, version in result.all()]
+    await notify(db, messages)
+    return messages
@@ -0,0 +1,73 @@
+import csv
+import io
+from typing import AsyncIterator, List, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from app.core.responses import dumps
+
+EXPORT_FORMATS = ("ndjson", "csv")
+# Строк на один fetch серверного курсора и на один отправляемый фрагмент ответа
+EXPORT_BATCH_SIZE = 2000
+
+USER_EXPORT_FIELDS = (
+    "id", "email", "first_name", "last_name", "middle_name", "is_active", "created_at", "updated_at",
+)
+
+
+def export_query(include_roles: bool):
+    from app.model.role import Role
+    from app.model.user import User
+    from app.model.user_role import UserRole
+
+    columns = [getattr(User, name) for name in USER_EXPORT_FIELDS]
+    if include_roles:
+        # Коррелированный подзапрос по PK user_roles: без GROUP BY по всей таблице,
+        # строки отдаются курсором по мере чтения
+        role_names = (
+            select(Role.name)
+            .join(UserRole, UserRole.role_id == Role.id)
+            .where(UserRole.user_id == User.id)
+            .order_by(Role.name)
+            .scalar_subquery()
+        )
+        columns.append(func.array(role_names).label("roles"))
+    return select(*columns)
+
+
+def _ndjson_chunk(fields: Sequence[str], rows) -> bytes:
+    return b"".join(dumps(dict(zip(fields, row))) + b"\n" for row in rows)
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return ";".join(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunk(rows: List[Sequence]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def export_users(fmt: str, include_roles: bool = False, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    # Сессия открывается внутри генератора: зависимости FastAPI закрываются до окончания
+    # StreamingResponse. Память постоянна — в ней держится одна пачка строк, а следующая
+    # читается только после того, как клиент принял предыдущую (backpressure через send).
+    from app.database.session import replicas
+
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    fields = USER_EXPORT_FIELDS + (("roles",) if include_roles else ())
+    if fmt == "csv":
+        yield _csv_chunk([fields])
+
+    async with replicas.session_factory()() as db:
+        result = await db.stream(export_query(include_roles).execution_options(yield_per=batch_size))
+        async for rows in result.partitions(batch_size):
+            yield _ndjson_chunk(fields, rows) if fmt == "ndjson" else _csv_chunk(rows)
@@ -0,0 +1,199 @@
+import asyncio
+import codecs
+import csv
+import json
+import uuid
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.bulk import existing_ids
+from app.crud.users import CRUDUser
+from app.model.user import User
+from app.schemas.user import UserImportError, UserImportReport, UserImportRow
+from app.services.password_service import SCHEMES, BulkPasswordHasher, get_bulk_password_hasher, identify_hash
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_METHODS = ("copy", "insert")
+IMPORT_BATCH_SIZE = 5000
+# Отчёт хранит не больше MAX_REPORTED_ERRORS строк, счётчики остаются точными
+MAX_REPORTED_ERRORS = 10000
+OPTIONAL_FIELDS = ("middle_name", "password", "hashed_password", "is_active")
+
+Record = Tuple[int, Optional[dict], Optional[str]]
+
+
+class ImportEncodingError(ValueError):
+    # Вход не в UTF-8; пачки до места ошибки уже импортированы
+    pass
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    # Разбивает поток байтов на строки, не читая тело запроса целиком
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    offset = 0
+    async for chunk in chunks:
+        try:
+            buffer += decoder.decode(chunk)
+        except UnicodeDecodeError as e:
+            raise ImportEncodingError(f"input is not valid UTF-8 near byte {offset + max(e.start, 0)}") from None
+        offset += len(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    try:
+        buffer += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise ImportEncodingError("input is not valid UTF-8: truncated multi-byte sequence at the end") from None
+    if buffer:
+        yield buffer
+
+
+async def iter_records(lines: AsyncIterable[str], fmt: str) -> AsyncIterator[Record]:
+    # (номер строки, данные, ошибка разбора). CSV читается построчно, поэтому
+    # переводы строк внутри значений не поддерживаются.
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format: {fmt}")
+    header: Optional[List[str]] = None
+    row_number = 0
+    async for line in lines:
+        line = line.rstrip("\r")
+        if not line.strip():
+            continue
+        if fmt == "csv" and header is None:
+            header = next(csv.reader([line]))
+            continue
+        row_number += 1
+        try:
+            if fmt == "ndjson":
+                data = json.loads(line)
+                if not isinstance(data, dict):
+                    raise ValueError("expected a JSON object")
+            else:
+                values = next(csv.reader([line]))
+                if len(values) != len(header):
+                    raise ValueError(f"expected {len(header)} columns, got {len(values)}")
+                data = dict(zip(header, values))
+                # Пустая ячейка CSV — отсутствующее значение
+                for field in OPTIONAL_FIELDS:
+                    if data.get(field) == "":
+                        data.pop(field)
+        except ValueError as e:
+            yield row_number, None, str(e)
+            continue
+        yield row_number, data, None
+
+
+class UserImporter:
+    def __init__(self, db: AsyncSession, hasher: BulkPasswordHasher, method: str = "copy",
+                 batch_size: int = IMPORT_BATCH_SIZE):
+        if method not in IMPORT_METHODS:
+            raise ValueError(f"Unknown import method: {method}")
+        self.db = db
+        self.hasher = hasher
+        self.method = method
+        self.batch_size = batch_size
+        self.report = UserImportReport()
+
+    def _error(self, row: int, email: Optional[str], status: str, error: Optional[str] = None) -> None:
+        self.report.failed += 1
+        if len(self.report.errors) < MAX_REPORTED_ERRORS:
+            self.report.errors.append(UserImportError(row=row, email=email, status=status, error=error))
+        else:
+            self.report.errors_truncated = True
+
+    def _validate(self, records: List[Record]) -> List[Tuple[int, UserImportRow]]:
+        valid = {}
+        for row, data, error in records:
+            if error is not None:
+                self._error(row, None, "invalid", error)
+                continue
+            try:
+                item = UserImportRow.model_validate(data)
+            except ValidationError as e:
+                first = e.errors()[0]
+                field = ".".join(str(part) for part in first["loc"])
+                self._error(row, data.get("email"), "invalid", f"{field}: {first['msg']}" if field else first["msg"])
+                continue
+            if item.hashed_password is not None and identify_hash(item.hashed_password) not in SCHEMES:
+                self._error(row, item.email, "invalid", "hashed_password: unsupported hash format")
+                continue
+            if item.email in valid:
+                self._error(row, item.email, "duplicate", "email repeated in the import")
+                continue
+            valid[item.email] = (row, item)
+        return list(valid.values())
+
+    async def _import_batch(self, records: List[Record]) -> None:
+        self.report.total += len(records)
+        items = self._validate(records)
+
+        # Существующие email отсеиваются одним запросом до хеширования
+        existing = await existing_ids(self.db, User.email, [item.email for _, item in items])
+        for row, item in items:
+            if item.email in existing:
+                self._error(row, item.email, "exists", "email already registered")
+        items = [(row, item) for row, item in items if item.email not in existing]
+
+        plaintext = [item for _, item in items if item.password is not None]
+        hashes = iter(await self.hasher.hash_many([item.password for item in plaintext]))
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "first_name": item.first_name,
+                "last_name": item.last_name,
+                "middle_name": item.middle_name,
+                "email": item.email,
+                "hashed_password": item.hashed_password if item.password is None else next(hashes),
+                "is_active": item.is_active,
+                "authz_version": 0,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for _, item in items
+        ]
+        inserted = await CRUDUser.bulk_insert(self.db, rows, self.method)
+        await self.db.commit()
+
+        self.report.created += len(inserted)
+        # Email, занятый параллельной вставкой после проверки
+        for row, item in items:
+            if item.email not in inserted:
+                self._error(row, item.email, "exists", "email already registered")
+
+    async def run(self, records: AsyncIterable[Record]) -> UserImportReport:
+        # Пачки коммитятся по отдельности: ошибка в середине не откатывает уже импортированное
+        batch: List[Record] = []
+        async for record in records:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                await self._import_batch(batch)
+                batch = []
+        if batch:
+            await self._import_batch(batch)
+        return self.report
+
+
+_import_slots: Optional[asyncio.Semaphore] = None
+
+
+def get_import_slots() -> asyncio.Semaphore:
+    global _import_slots
+    if _import_slots is None:
+        from app.core.config import settings
+        _import_slots = asyncio.Semaphore(settings.import_max_concurrent)
+    return _import_slots
+
+
+async def import_users(db: AsyncSession, lines: AsyncIterable[str], fmt: str, method: str = "copy",
+                       hasher: Optional[BulkPasswordHasher] = None) -> UserImportReport:
+    # Без hasher (HTTP) — общий пул процесса, а лишние импорты ждут своей очереди,
+    # чтобы не отнимать ядра у хеширования при входе
+    if hasher is not None:
+        return await UserImporter(db, hasher, method).run(iter_records(lines, fmt))
+    async with get_import_slots():
+        return await UserImporter(db, get_bulk_password_hasher(), method).run(iter_records(lines, fmt))
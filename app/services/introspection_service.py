@@ -0,0 +1,106 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from uuid import UUID
+
+from jose import JWTError
+from sqlalchemy import LargeBinary, any_, false, literal, union_all
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.security import decode_token
+from app.crud.refresh_token import hash_token
+from app.model.refresh_token import RefreshToken
+from app.model.user import User
+from app.services.auth_service import REFRESH_TOKEN_USE, TOKEN_USE_CLAIM
+
+INACTIVE = {"active": False}
+
+
+async def introspect_tokens(db: AsyncSession, tokens: List[str]) -> List[dict]:
+    # Ответы в формате RFC 7662, по одному на каждый токен в исходном порядке.
+    # Подписи проверяются локально, состояние пользователей и refresh токенов —
+    # одним запросом к users и одним к refresh_tokens на весь пакет.
+    payloads: List[Optional[dict]] = []
+    for token in tokens:
+        try:
+            payload = decode_token(token)
+        except JWTError:
+            payload = None
+        if payload is not None and not isinstance(payload.get("sub"), str):
+            payload = None
+        payloads.append(payload)
+
+    emails = {p["sub"] for p in payloads if p is not None}
+    if not emails:
+        return [dict(INACTIVE) for _ in tokens]
+
+    result = await db.execute(
+        select(User.id, User.email, User.is_active)
+        .where(User.email == any_(literal(list(emails), type_=ARRAY(User.email.type))))
+    )
+    users: Dict[str, tuple] = {email: (user_id, is_active) for user_id, email, is_active in result.all()}
+
+    hashes = {
+        token: hash_token(token)
+        for token, payload in zip(tokens, payloads)
+        if payload is not None
+    }
+    user_ids = [user_id for user_id, _ in users.values()]
+    refresh_tokens, users_with_active_tokens = await _refresh_token_state(db, list(set(hashes.values())), user_ids)
+
+    results = []
+    for token, payload in zip(tokens, payloads):
+        if payload is None or payload["sub"] not in users:
+            results.append(dict(INACTIVE))
+            continue
+        user_id, is_active = users[payload["sub"]]
+        token_hash = hashes[token]
+        if token_hash in refresh_tokens:
+            token_type = "refresh_token"
+            active = is_active and not refresh_tokens[token_hash]
+        elif payload.get(TOKEN_USE_CLAIM) == REFRESH_TOKEN_USE:
+            # Refresh токен без строки в БД (не сохранён или удалён очисткой)
+            active = False
+        else:
+            # Access токен действителен, пока у пользователя есть активная сессия
+            token_type = "access_token"
+            active = is_active and user_id in users_with_active_tokens
+        if not active:
+            results.append(dict(INACTIVE))
+            continue
+        entry = {
+            "active": True,
+            "token_type": token_type,
+            "sub": str(user_id),
+            "username": payload["sub"],
+            "exp": payload.get("exp"),
+        }
+        if "roles" in payload:
+            entry["scope"] = " ".join(payload["roles"])
+        results.append(entry)
+    return results
+
+
+async def _refresh_token_state(db: AsyncSession, hashes: List[bytes], user_ids: List[UUID]):
+    # Один запрос: статус найденных refresh токенов + пользователи с активными токенами
+    matched = select(
+        RefreshToken.token_hash, RefreshToken.user_id, RefreshToken.revoked
+    ).where(RefreshToken.token_hash == any_(literal(hashes, type_=ARRAY(LargeBinary()))))
+    active_users = select(
+        literal(None, type_=LargeBinary()).label("token_hash"), RefreshToken.user_id, false().label("revoked")
+    ).where(
+        RefreshToken.user_id == any_(literal(user_ids, type_=ARRAY(RefreshToken.user_id.type))),
+        RefreshToken.revoked == False,
+        RefreshToken.expires_at > datetime.utcnow(),
+    ).distinct()
+    result = await db.execute(union_all(matched, active_users))
+
+    refresh_tokens: Dict[bytes, bool] = {}
+    users_with_active_tokens: Set[UUID] = set()
+    for token_hash, user_id, revoked in result.all():
+        if token_hash is not None:
+            refresh_tokens[token_hash] = revoked
+        if not revoked:
+            users_with_active_tokens.add(user_id)
+    return refresh_tokens, users_with_active_tokens
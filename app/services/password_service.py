@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+SCHEMES = ("bcrypt", "argon2")
+# Нижняя граница калибровки и верхняя граница для bcrypt (стоимость растёт как 2^rounds)
+MIN_ROUNDS = {"bcrypt": 10, "argon2": 2}
+MAX_ROUNDS = {"bcrypt": 16, "argon2": 50}
+CALIBRATION_PASSWORD = "calibration-password"
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def context_config(scheme: str, rounds: int, argon2_memory_cost: int = 65536, argon2_parallelism: int = 2) -> dict:
+    # Хеши остальных схем и хеши с меньшей стоимостью помечаются needs_update
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown password hash scheme: {scheme}")
+    config = {
+        "schemes": [scheme] + [other for other in SCHEMES if other != scheme],
+        "default": scheme,
+        "deprecated": "auto",
+        f"{scheme}__default_rounds": rounds,
+        f"{scheme}__min_rounds": rounds,
+    }
+    if scheme == "argon2":
+        config["argon2__memory_cost"] = argon2_memory_cost
+        config["argon2__parallelism"] = argon2_parallelism
+    return config
+
+
+def configure_context(config: dict) -> None:
+    # Вызывается и в основном процессе, и как initializer воркеров ProcessPoolExecutor
+    global pwd_context
+    pwd_context = CryptContext(**config)
+
+
+def _measure(handler, rounds: int) -> float:
+    hasher = handler.using(rounds=rounds)
+    best = float("inf")
+    for _ in range(2):
+        started = time.perf_counter()
+        hasher.hash(CALIBRATION_PASSWORD)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def calibrate_rounds(scheme: str, target_ms: float, argon2_memory_cost: int = 65536, argon2_parallelism: int = 2) -> int:
+    # Наибольшая стоимость, при которой хеширование укладывается в target_ms на этой машине
+    target = target_ms / 1000
+    rounds = MIN_ROUNDS[scheme]
+    if scheme == "bcrypt":
+        from passlib.hash import bcrypt
+        elapsed = _measure(bcrypt, rounds)
+        while rounds < MAX_ROUNDS[scheme] and elapsed * 2 <= target:
+            rounds += 1
+            elapsed *= 2
+        return rounds
+
+    from passlib.hash import argon2
+    handler = argon2.using(memory_cost=argon2_memory_cost, parallelism=argon2_parallelism)
+    # Время argon2 растёт линейно с time_cost
+    per_round = _measure(handler, rounds) / rounds
+    return max(rounds, min(MAX_ROUNDS[scheme], int(target / per_round)))
+
+
+# Функции уровня модуля, чтобы их можно было передать в ProcessPoolExecutor
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+def _hash_many(passwords: Sequence[str]) -> List[str]:
+    return [pwd_context.hash(password) for password in passwords]
+
+
+def identify_hash(hashed_password: str) -> Optional[str]:
+    # Схема готового хеша (bcrypt/argon2) или None, если формат не поддерживается
+    return pwd_context.identify(hashed_password)
+
+
+class PasswordHasher:
+    # bcrypt/argon2 выполняются в отдельном пуле, чтобы не блокировать event loop.
+    # Если очередь превышает max_pending, запрос сразу получает 503 + Retry-After.
+    def __init__(self, config: dict, executor_kind: str = "thread", workers: int = 4, max_pending: int = 64, retry_after: int = 1):
+        if executor_kind not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash executor: {executor_kind}")
+        self.config = config
+        configure_context(config)
+        self.executor_kind = executor_kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=configure_context, initargs=(self.config,)
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервис перегружен, повторите попытку позже",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        # Новый хеш возвращается, если сохранённый устарел (другая схема или меньшая стоимость)
+        return await self._run(_verify_and_update, password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class BulkPasswordHasher:
+    # Отдельный пул процессов для массового импорта: хеши считаются пачками на всех ядрах,
+    # не занимая пул и лимит очереди, которые обслуживают вход пользователей.
+    def __init__(self, config: dict, workers: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=configure_context, initargs=(config,)
+        )
+
+    async def hash_many(self, passwords: Sequence[str]) -> List[str]:
+        if not passwords:
+            return []
+        loop = asyncio.get_running_loop()
+        size = math.ceil(len(passwords) / self.workers)
+        chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+        results = await asyncio.gather(*(loop.run_in_executor(self._executor, _hash_many, chunk) for chunk in chunks))
+        return [hashed for chunk in results for hashed in chunk]
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self) -> "BulkPasswordHasher":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+
+_password_hasher: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    # Отложенный импорт настроек для избежания циклов
+    global _password_hasher
+    if _password_hasher is None:
+        from app.core.config import settings
+        scheme = settings.password_hash_scheme
+        argon2_options = {
+            "argon2_memory_cost": settings.argon2_memory_cost_kib,
+            "argon2_parallelism": settings.argon2_parallelism,
+        }
+        rounds = settings.password_hash_rounds
+        if rounds is None:
+            rounds = calibrate_rounds(scheme, settings.password_hash_target_ms, **argon2_options)
+            logger.info("Calibrated %s cost to %d rounds for %.0f ms", scheme, rounds, settings.password_hash_target_ms)
+        _password_hasher = PasswordHasher(
+            context_config(scheme, rounds, **argon2_options),
+            executor_kind=settings.password_hash_executor,
+            workers=settings.password_hash_workers,
+            max_pending=settings.password_hash_max_pending,
+            retry_after=settings.password_hash_retry_after_seconds,
+        )
+    return _password_hasher
+
+
+async def hash_password(password: str) -> str:
+    return await get_password_hasher().hash(password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await get_password_hasher().verify(plain_password, hashed_password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await get_password_hasher().verify_and_update(plain_password, hashed_password)
+
+
+def bulk_password_hasher(workers: Optional[int] = None) -> BulkPasswordHasher:
+    return BulkPasswordHasher(get_password_hasher().config, workers)
+
+
+_bulk_password_hasher: Optional[BulkPasswordHasher] = None
+
+
+def get_bulk_password_hasher() -> BulkPasswordHasher:
+    # Один пул на процесс для импорта через HTTP: не создаётся заново на каждый запрос
+    global _bulk_password_hasher
+    if _bulk_password_hasher is None:
+        from app.core.config import settings
+        _bulk_password_hasher = bulk_password_hasher(settings.import_hash_workers)
+    return _bulk_password_hasher
+
+
+async def init_password_hasher() -> None:
+    # Калибровка занимает до секунды, поэтому выполняется при старте и вне event loop
+    await asyncio.to_thread(get_password_hasher)
+
+
+def shutdown_password_hasher() -> None:
+    global _bulk_password_hasher
+    if _password_hasher is not None:
+        _password_hasher.shutdown()
+    if _bulk_password_hasher is not None:
+        _bulk_password_hasher.close()
+        _bulk_password_hasher = None
@@ -0,0 +1,278 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import any_, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.model.permission import Permission
+from app.model.role_hierarchy import RoleClosure
+from app.model.role_permission import RolePermission
+from app.model.user_role import UserRole
+
+
+@dataclass
+class UserGrants:
+    # Роли пользователя и их объединённая маска для версии каталога version
+    role_ids: FrozenSet[UUID]
+    mask: int
+    version: int
+
+
+class PermissionCache:
+    # LRU-кэш ролей и маски прав пользователя с TTL.
+    # Кэш локален для процесса: инвалидация из CRUD видна только текущему воркеру,
+    # остальные воркеры догоняют не позже чем через ttl секунд.
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self._data: "OrderedDict[UUID, tuple[float, UserGrants]]" = OrderedDict()
+
+    def get(self, user_id: UUID) -> Optional[UserGrants]:
+        entry = self._data.get(user_id)
+        if entry is None:
+            return None
+        expires_at, permissions = entry
+        if expires_at <= time.monotonic():
+            del self._data[user_id]
+            return None
+        self._data.move_to_end(user_id)
+        return permissions
+
+    def set(self, user_id: UUID, permissions: UserGrants, generation: Optional[int] = None) -> None:
+        # Результат, посчитанный до инвалидации, не кладём в кэш
+        if generation is not None and generation != self.generation:
+            return
+        self._data[user_id] = (time.monotonic() + self.ttl, permissions)
+        self._data.move_to_end(user_id)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, user_id: UUID) -> None:
+        self.generation += 1
+        self._data.pop(user_id, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class PermissionCatalog:
+    # Каталог прав, скомпилированный в битовые маски: у каждого права "resource:action"
+    # свой бит, у каждой роли — маска её прав. Маска пользователя — OR масок его ролей,
+    # проверка — одно AND. Изменения role_permissions помечают роли как dirty, и при
+    # следующей проверке перечитываются только они; version растёт при каждом изменении,
+    # чтобы закэшированные маски пользователей пересчитались без обращения к БД.
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self.bits: Dict[str, int] = {}
+        self.permission_bits: Dict[UUID, int] = {}
+        self.role_masks: Dict[UUID, int] = {}
+        self.version = 0
+        self.loaded_at: Optional[float] = None
+        self._next_bit = 0
+        self._reload_all = True
+        self._dirty_roles: Set[UUID] = set()
+        self._required: Dict[FrozenSet[str], int] = {}
+        self._lock = asyncio.Lock()
+
+    def mark_all_dirty(self) -> None:
+        self._reload_all = True
+
+    def mark_role_dirty(self, role_id: UUID) -> None:
+        self._dirty_roles.add(role_id)
+
+    @property
+    def needs_refresh(self) -> bool:
+        # Полная перекомпиляция не реже раза в ttl: страховка, если NOTIFY не дошёл
+        expired = self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl
+        return self._reload_all or expired or bool(self._dirty_roles)
+
+    def _assign(self, permission_id: UUID, name: str) -> int:
+        bit = self.permission_bits.get(permission_id)
+        if bit is None:
+            bit = self.permission_bits[permission_id] = self._next_bit
+            self._next_bit += 1
+            self.bits[name] = bit
+            self._required.clear()
+        return bit
+
+    async def refresh(self, db: AsyncSession) -> None:
+        if not self.needs_refresh:
+            return
+        async with self._lock:
+            if not self.needs_refresh:
+                return
+            expired = self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl
+            # Сообщения, пришедшие во время загрузки, остаются необработанными до следующей проверки
+            dirty_roles = set(self._dirty_roles)
+            if self._reload_all or expired:
+                self._reload_all = False
+                try:
+                    await self._load_all(db)
+                except BaseException:
+                    self._reload_all = True
+                    raise
+            else:
+                await self._load_roles(db, dirty_roles)
+            self._dirty_roles -= dirty_roles
+            self.version += 1
+
+    async def _load_all(self, db: AsyncSession) -> None:
+        permissions = await db.execute(
+            select(Permission.id, Permission.resource, Permission.action).order_by(Permission.id)
+        )
+        grants = await db.execute(select(RolePermission.role_id, RolePermission.permission_id))
+
+        # Перекомпиляция с нуля заодно уплотняет биты удалённых прав
+        self.bits, self.permission_bits, self._next_bit = {}, {}, 0
+        self._required.clear()
+        for permission_id, resource, action in permissions.all():
+            self._assign(permission_id, f"{resource}:{action}")
+        role_masks: Dict[UUID, int] = {}
+        for role_id, permission_id in grants.all():
+            bit = self.permission_bits.get(permission_id)
+            if bit is not None:
+                role_masks[role_id] = role_masks.get(role_id, 0) | (1 << bit)
+        self.role_masks = role_masks
+        self.loaded_at = time.monotonic()
+
+    async def _load_roles(self, db: AsyncSession, role_ids: Set[UUID]) -> None:
+        result = await db.execute(
+            select(RolePermission.role_id, Permission.id, Permission.resource, Permission.action)
+            .join(Permission, Permission.id == RolePermission.permission_id)
+            .where(RolePermission.role_id == any_(literal(list(role_ids), type_=ARRAY(RolePermission.role_id.type))))
+        )
+        role_masks = dict.fromkeys(role_ids, 0)
+        for role_id, permission_id, resource, action in result.all():
+            # Право, созданное в другом воркере, получает следующий свободный бит
+            role_masks[role_id] |= 1 << self._assign(permission_id, f"{resource}:{action}")
+        for role_id, mask in role_masks.items():
+            if mask:
+                self.role_masks[role_id] = mask
+            else:
+                self.role_masks.pop(role_id, None)
+
+    def mask_for_roles(self, role_ids: Iterable[UUID]) -> int:
+        mask = 0
+        for role_id in role_ids:
+            mask |= self.role_masks.get(role_id, 0)
+        return mask
+
+    def required_mask(self, permissions: Iterable[str]) -> int:
+        # Неизвестные права не получают бит и не могут быть выданы
+        key = frozenset(permissions)
+        mask = self._required.get(key)
+        if mask is None:
+            mask = 0
+            for name in key:
+                bit = self.bits.get(name)
+                if bit is not None:
+                    mask |= 1 << bit
+            self._required[key] = mask
+        return mask
+
+    def names(self, mask: int) -> FrozenSet[str]:
+        return frozenset(name for name, bit in self.bits.items() if mask >> bit & 1)
+
+
+_permission_cache: Optional[PermissionCache] = None
+_permission_catalog: Optional[PermissionCatalog] = None
+
+
+def get_permission_cache() -> PermissionCache:
+    # Отложенный импорт настроек для избежания циклов
+    global _permission_cache
+    if _permission_cache is None:
+        from app.core.config import settings
+        _permission_cache = PermissionCache(
+            maxsize=settings.permission_cache_max_size,
+            ttl=settings.permission_cache_ttl_seconds,
+        )
+    return _permission_cache
+
+
+def get_permission_catalog() -> PermissionCatalog:
+    global _permission_catalog
+    if _permission_catalog is None:
+        from app.core.config import settings
+        _permission_catalog = PermissionCatalog(ttl=settings.permission_cache_ttl_seconds)
+    return _permission_catalog
+
+
+async def load_user_role_ids(db: AsyncSession, user_id: UUID) -> FrozenSet[UUID]:
+    # Эффективные роли: назначенные и все их предки — один join по PK role_closure
+    result = await db.execute(
+        select(RoleClosure.ancestor_id)
+        .join(UserRole, UserRole.role_id == RoleClosure.descendant_id)
+        .where(UserRole.user_id == user_id)
+        .distinct()
+    )
+    return frozenset(result.scalars().all())
+
+
+async def get_user_permission_mask(db: AsyncSession, user_id: UUID) -> int:
+    catalog = get_permission_catalog()
+    await catalog.refresh(db)
+    cache = get_permission_cache()
+    grants = cache.get(user_id)
+    if grants is None:
+        generation = cache.generation
+        role_ids = await load_user_role_ids(db, user_id)
+        grants = UserGrants(role_ids, catalog.mask_for_roles(role_ids), catalog.version)
+        cache.set(user_id, grants, generation)
+    elif grants.version != catalog.version:
+        # Изменились маски ролей: роли пользователя те же, пересчёт без запроса к БД
+        grants.mask = catalog.mask_for_roles(grants.role_ids)
+        grants.version = catalog.version
+    return grants.mask
+
+
+async def has_any_permission(db: AsyncSession, user_id: UUID, permissions: Iterable[str]) -> bool:
+    mask = await get_user_permission_mask(db, user_id)
+    return mask & get_permission_catalog().required_mask(permissions) != 0
+
+
+async def get_user_permissions(db: AsyncSession, user_id: UUID) -> FrozenSet[str]:
+    mask = await get_user_permission_mask(db, user_id)
+    return get_permission_catalog().names(mask)
+
+
+def role_permission_messages(role_ids: Iterable[UUID]) -> List[str]:
+    # Сообщения для notify/apply_local: перечитать маски этих ролей во всех воркерах
+    return [f"perms:role:{role_id}" for role_id in set(role_ids)]
+
+
+CATALOG_CHANGED = "perms:all"
+# Изменилась иерархия ролей: закэшированные наборы эффективных ролей устарели
+USER_ROLES_CHANGED = "perms:users"
+
+
+def apply_catalog_message(value: str) -> None:
+    catalog = get_permission_catalog()
+    if value == "all":
+        catalog.mark_all_dirty()
+    elif value == "users":
+        invalidate_all_permissions()
+    else:
+        kind, _, role_id = value.partition(":")
+        if kind != "role":
+            raise ValueError(value)
+        catalog.mark_role_dirty(UUID(role_id))
+
+
+def invalidate_user_permissions(user_id: UUID) -> None:
+    get_permission_cache().invalidate(user_id)
+
+
+def invalidate_all_permissions() -> None:
+    get_permission_cache().clear()
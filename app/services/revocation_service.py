@@ -0,0 +1,254 @@
+import asyncio
+import calendar
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+
+import asyncpg
+from sqlalchemy import func, or_, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "auth_revocations"
+# Лимит payload у NOTIFY 8000 байт, сообщения упаковываются построчно
+MAX_PAYLOAD_SIZE = 7500
+# Как часто из памяти удаляются записи, которые уже ничего не отсекают
+PRUNE_INTERVAL_SECONDS = 60.0
+
+
+def get_settings():
+    from app.core.config import settings
+    return settings
+
+
+def utc_timestamp(value: datetime) -> float:
+    # Время в refresh_tokens хранится в UTC без tzinfo
+    return float(calendar.timegm(value.utctimetuple()))
+
+
+class RevocationList:
+    # Пока список готов (ready), проверки отзыва отвечаются из памяти:
+    # - revoked_tokens: отозванные refresh токены (SHA-256 -> exp); записи живут до exp,
+    #   после него токен отклоняет проверка подписи;
+    # - logged_out_users: пользователи, у которых не осталось активных refresh токенов
+    #   (-> срок записи). Выданные им access токены живут не дольше
+    #   access_token_expire_minutes, столько же живёт и запись.
+    def __init__(self):
+        self.revoked_tokens: Dict[bytes, float] = {}
+        self.logged_out_users: Dict[UUID, float] = {}
+        self.ready = False
+        self._pending: Optional[List[str]] = None
+        self._next_prune = 0.0
+
+    @staticmethod
+    def logout_window() -> float:
+        return get_settings().access_token_expire_minutes * 60.0
+
+    def is_token_revoked(self, token_hash: bytes) -> bool:
+        return token_hash in self.revoked_tokens
+
+    def is_user_logged_out(self, user_id: UUID) -> bool:
+        deadline = self.logged_out_users.get(user_id)
+        return deadline is not None and deadline > time.time()
+
+    def apply(self, message: str) -> None:
+        if self._pending is not None:
+            self._pending.append(message)
+        self._apply(message)
+        self._maybe_prune()
+
+    def _apply(self, message: str) -> None:
+        # Импорт здесь, чтобы не тянуть модели при импорте модуля
+        from app.services.auth_service import authz_versions
+        from app.services.permissions_service import apply_catalog_message
+
+        kind, _, value = message.partition(":")
+        try:
+            if kind == "token":
+                token_hash, _, expires_at = value.partition(":")
+                if expires_at:
+                    deadline = float(expires_at)
+                else:
+                    deadline = time.time() + get_settings().refresh_token_expire_days * 86400
+                self.revoked_tokens[bytes.fromhex(token_hash)] = deadline
+            elif kind == "user":
+                self.logged_out_users[UUID(value)] = time.time() + self.logout_window()
+            elif kind == "user_active":
+                self.logged_out_users.pop(UUID(value), None)
+            elif kind == "authz":
+                user_id, _, version = value.partition(":")
+                authz_versions.update(UUID(user_id), int(version))
+            elif kind == "perms":
+                apply_catalog_message(value)
+            else:
+                logger.warning("Unknown revocation message: %s", message)
+        except ValueError:
+            logger.warning("Malformed revocation message: %s", message)
+
+    def _maybe_prune(self) -> None:
+        now = time.time()
+        if now < self._next_prune:
+            return
+        self._next_prune = now + PRUNE_INTERVAL_SECONDS
+        self.prune(now)
+
+    def prune(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        self.revoked_tokens = {h: exp for h, exp in self.revoked_tokens.items() if exp > now}
+        self.logged_out_users = {u: exp for u, exp in self.logged_out_users.items() if exp > now}
+
+    async def load(self, db: AsyncSession) -> None:
+        from app.model.refresh_token import RefreshToken
+
+        self.ready = False
+        self._pending = []
+        try:
+            now = datetime.utcnow()
+            # Истёкшие токены уже не пройдут проверку exp
+            tokens = await db.execute(
+                select(RefreshToken.token_hash, RefreshToken.expires_at).where(
+                    RefreshToken.revoked == True,
+                    RefreshToken.expires_at > now,
+                )
+            )
+            self.revoked_tokens = {token_hash: utc_timestamp(expires_at) for token_hash, expires_at in tokens.all()}
+            # Без активных токенов, но с токеном, отозванным или истёкшим недавно:
+            # у таких пользователей ещё могут быть действующие access токены
+            window = self.logout_window()
+            users = await db.execute(
+                select(RefreshToken.user_id)
+                .group_by(RefreshToken.user_id)
+                .having(
+                    func.bool_and(or_(RefreshToken.revoked == True, RefreshToken.expires_at <= now)),
+                    func.max(RefreshToken.expires_at) > now - timedelta(seconds=window),
+                )
+            )
+            deadline = time.time() + window
+            self.logged_out_users = {user_id: deadline for user_id in users.scalars().all()}
+            # Пока слушатель был отключён, изменения каталога прав могли потеряться
+            from app.services.permissions_service import get_permission_catalog
+            get_permission_catalog().mark_all_dirty()
+            # Применяем сообщения, пришедшие во время загрузки
+            for message in self._pending:
+                self._apply(message)
+        finally:
+            self._pending = None
+        self.ready = True
+
+
+revocation_list = RevocationList()
+
+
+def pack_messages(messages: Iterable[str]) -> List[str]:
+    payloads: List[str] = []
+    current: List[str] = []
+    size = 0
+    for message in messages:
+        if current and size + len(message) + 1 > MAX_PAYLOAD_SIZE:
+            payloads.append("\n".join(current))
+            current, size = [], 0
+        current.append(message)
+        size += len(message) + 1
+    if current:
+        payloads.append("\n".join(current))
+    return payloads
+
+
+async def notify(db: AsyncSession, messages: Iterable[str]) -> None:
+    # NOTIFY доставляется слушателям только после commit транзакции
+    payloads = pack_messages(messages)
+    if not payloads:
+        return
+    await db.execute(
+        text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+        {"channel": CHANNEL, "payloads": payloads},
+    )
+
+
+def apply_local(messages: Iterable[str]) -> None:
+    # Применяем изменения в текущем воркере сразу после commit, не дожидаясь NOTIFY
+    for message in messages:
+        revocation_list.apply(message)
+
+
+class RevocationListener:
+    def __init__(self, dsn: str, session_factory, reconnect_delay: float = 1.0):
+        self.dsn = dsn
+        self.session_factory = session_factory
+        self.reconnect_delay = reconnect_delay
+        self._task: Optional[asyncio.Task] = None
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        for message in payload.splitlines():
+            revocation_list.apply(message)
+
+    async def _listen_once(self) -> None:
+        connection = await asyncpg.connect(self.dsn)
+        lost = asyncio.Event()
+        connection.add_termination_listener(lambda _: lost.set())
+        try:
+            # Сначала LISTEN, затем загрузка: так не теряются отзывы во время старта
+            await connection.add_listener(CHANNEL, self._on_notification)
+            async with self.session_factory() as db:
+                await revocation_list.load(db)
+            await lost.wait()
+        finally:
+            revocation_list.ready = False
+            if not connection.is_closed():
+                await connection.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Revocation listener failed, reconnecting")
+            await asyncio.sleep(self.reconnect_delay)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_listener: Optional[RevocationListener] = None
+
+
+def listener_dsn(database_url: str) -> str:
+    # asyncpg принимает только схему postgresql:// без указания драйвера
+    url = make_url(database_url).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+async def start_revocation_listener() -> None:
+    global _listener
+    settings = get_settings()
+    if not settings.revocation_listener_enabled or _listener is not None:
+        return
+    from app.database.session import async_session
+    # LISTEN не работает через пулер в transaction mode, поэтому можно задать прямой адрес
+    dsn = listener_dsn(settings.database_direct_url or settings.database_url)
+    _listener = RevocationListener(dsn, async_session)
+    _listener.start()
+
+
+async def stop_revocation_listener() -> None:
+    global _listener
+    if _listener is not None:
+        await _listener.stop()
+        _listener = None
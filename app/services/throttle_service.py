@@ -0,0 +1,119 @@
+import math
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy import delete as sqlalchemy_delete, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def get_settings():
+    from app.core.config import settings
+    return settings
+
+
+class MemoryBucketBackend:
+    # Token bucket в памяти процесса: каждый воркер считает попытки независимо
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def consume(self, db: AsyncSession, key: str, capacity: float, rate: float) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return 0.0 if allowed else (1 - tokens) / rate
+
+
+class PostgresBucketBackend:
+    # Общий для всех воркеров token bucket: пополнение и списание одним UPSERT
+    CONSUME = text("""
+        INSERT INTO login_throttle (key, tokens, allowed, updated_at)
+        VALUES (:key, :capacity - 1, true, now())
+        ON CONFLICT (key) DO UPDATE SET
+            allowed = LEAST(:capacity, login_throttle.tokens
+                + EXTRACT(EPOCH FROM now() - login_throttle.updated_at) * :rate) >= 1,
+            tokens = LEAST(:capacity, login_throttle.tokens
+                + EXTRACT(EPOCH FROM now() - login_throttle.updated_at) * :rate)
+                - CASE WHEN LEAST(:capacity, login_throttle.tokens
+                    + EXTRACT(EPOCH FROM now() - login_throttle.updated_at) * :rate) >= 1 THEN 1 ELSE 0 END,
+            updated_at = now()
+        RETURNING allowed, tokens
+    """)
+
+    async def consume(self, db: AsyncSession, key: str, capacity: float, rate: float) -> float:
+        result = await db.execute(self.CONSUME, {"key": key, "capacity": capacity, "rate": rate})
+        allowed, tokens = result.one()
+        await db.commit()
+        return 0.0 if allowed else (1 - tokens) / rate
+
+
+async def purge_stale_buckets(db: AsyncSession, idle: timedelta = timedelta(days=1)) -> int:
+    # Давно не обновлявшиеся корзины уже полностью пополнены, их можно удалить
+    from app.model.login_throttle import LoginThrottle
+
+    result = await db.execute(
+        sqlalchemy_delete(LoginThrottle)
+        .where(LoginThrottle.updated_at < func.now() - idle)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        name = get_settings().login_throttle_backend
+        if name == "memory":
+            _backend = MemoryBucketBackend()
+        elif name == "postgres":
+            _backend = PostgresBucketBackend()
+        else:
+            raise RuntimeError(f"Unknown login throttle backend: {name}")
+    return _backend
+
+
+def client_ip(request: Request) -> str:
+    settings = get_settings()
+    if settings.trust_forwarded_for:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def enforce_login_throttle(request: Request, db: AsyncSession, email: str) -> None:
+    # Вызывается до поиска пользователя и bcrypt: отсекает перебор дёшево
+    settings = get_settings()
+    if not settings.login_throttle_enabled:
+        return
+    backend = get_backend()
+    retry_after = max(
+        await backend.consume(
+            db, f"ip:{client_ip(request)}",
+            settings.login_throttle_ip_burst, settings.login_throttle_ip_per_minute / 60,
+        ),
+        await backend.consume(
+            db, f"email:{email.strip().lower()}",
+            settings.login_throttle_email_burst, settings.login_throttle_email_per_minute / 60,
+        ),
+    )
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Слишком много попыток входа, повторите позже",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete as sqlalchemy_delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory lock: очистку в каждый момент выполняет только один воркер
+PURGE_LOCK_KEY = 0x72746B6E  # "rtkn"
+
+
+def get_settings():
+    from app.core.config import settings
+    return settings
+
+
+async def purge_batch(db: AsyncSession, batch_size: int) -> Optional[int]:
+    # Удаляет до batch_size истёкших токенов одной короткой транзакцией.
+    # None — очистку уже выполняет другой воркер.
+    # Отозванные токены удаляются только после expires_at: до этого их подпись ещё
+    # валидна, и строка с revoked = True нужна, чтобы токен отклонялся.
+    from app.model.refresh_token import RefreshToken
+
+    locked = await db.scalar(select(func.pg_try_advisory_xact_lock(PURGE_LOCK_KEY)))
+    if not locked:
+        await db.rollback()
+        return None
+
+    candidates = (
+        select(RefreshToken.id)
+        .where(RefreshToken.expires_at < datetime.utcnow())
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        sqlalchemy_delete(RefreshToken)
+        .where(RefreshToken.id.in_(candidates.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def purge_refresh_tokens(session_factory, batch_size: int, pause: float) -> int:
+    total = 0
+    while True:
+        async with session_factory() as db:
+            deleted = await purge_batch(db, batch_size)
+        if deleted is None:
+            break
+        total += deleted
+        if deleted < batch_size:
+            break
+        # Пауза между пачками, чтобы не держать нагрузку на таблицу и WAL
+        await asyncio.sleep(pause)
+    return total
+
+
+class TokenPurger:
+    # Периодическая очистка refresh токенов и корзин login_throttle; задачи
+    # включаются независимо, чтобы отключение одной не останавливало другую
+    def __init__(
+        self,
+        session_factory,
+        interval: float,
+        batch_size: int,
+        pause: float,
+        purge_tokens: bool = True,
+        purge_throttle: bool = False,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self.purge_tokens = purge_tokens
+        self.purge_throttle = purge_throttle
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            if self.purge_tokens:
+                try:
+                    deleted = await purge_refresh_tokens(
+                        self.session_factory, self.batch_size, self.pause
+                    )
+                    if deleted:
+                        logger.info("Purged %d refresh tokens", deleted)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("Refresh token purge failed")
+            if self.purge_throttle:
+                try:
+                    from app.services.throttle_service import purge_stale_buckets
+                    async with self.session_factory() as db:
+                        deleted = await purge_stale_buckets(db)
+                    if deleted:
+                        logger.info("Purged %d login throttle buckets", deleted)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("Login throttle purge failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_purger: Optional[TokenPurger] = None
+
+
+async def start_token_purger() -> None:
+    global _purger
+    settings = get_settings()
+    purge_tokens = settings.refresh_token_purge_enabled
+    # Корзины в Postgres чистятся всегда: иначе таблица растёт с каждым новым IP и email
+    purge_throttle = settings.login_throttle_backend == "postgres"
+    if not (purge_tokens or purge_throttle) or _purger is not None:
+        return
+    from app.database.session import async_session
+    _purger = TokenPurger(
+        async_session,
+        interval=settings.refresh_token_purge_interval_seconds,
+        batch_size=settings.refresh_token_purge_batch_size,
+        pause=settings.refresh_token_purge_pause_seconds,
+        purge_tokens=purge_tokens,
+        purge_throttle=purge_throttle,
+    )
+    _purger.start()
+
+
+async def stop_token_purger() -> None:
+    global _purger
+    if _purger is not None:
+        await _purger.stop()
+        _purger = None
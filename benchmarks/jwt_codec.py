@@ -0,0 +1,107 @@
+"""Микробенчмарк кодека JWT: encode/decode ops/sec для python-jose и TokenCodec.
+
+    python -m benchmarks.jwt_codec --algorithm HS256 --number 20000
+    python -m benchmarks.jwt_codec --algorithm RS256 --output jwt.json
+
+Не требует базы данных и переменных окружения приложения.
+"""
+import argparse
+import json
+import tempfile
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from jose import jwt
+
+from app.core.security import HmacBackend, JoseBackend, KeySet, TokenCodec
+
+CLAIMS = {
+    "sub": "bench-user@example.com",
+    "uid": "4b0e3b6c-7f0e-4a39-9d64-2a1c7f6f0b11",
+    "roles": ["user", "admin"],
+    "av": 3,
+}
+
+
+def generate_key(algorithm: str, directory: Path) -> None:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    if algorithm.startswith("RS"):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        key = ec.generate_private_key(ec.SECP256R1())
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    (directory / "bench.pem").write_bytes(pem)
+
+
+def ops_per_sec(func, number: int) -> float:
+    elapsed = min(timeit.repeat(func, number=number, repeat=3))
+    return round(number / elapsed, 1)
+
+
+def run(algorithm: str, number: int) -> dict:
+    claims = {**CLAIMS, "exp": datetime.utcnow() + timedelta(hours=1)}
+    with tempfile.TemporaryDirectory() as directory:
+        if algorithm.startswith("HS"):
+            key_set = KeySet(algorithm, "bench-secret")
+        else:
+            generate_key(algorithm, Path(directory))
+            key_set = KeySet(algorithm, "", keys_dir=directory)
+
+    backends = [JoseBackend()]
+    if key_set.symmetric:
+        backends.append(HmacBackend())
+    try:
+        from app.core.security import PyJWTBackend
+        backends.append(PyJWTBackend())
+    except ImportError:
+        pass
+
+    results = {}
+
+    # Базовая линия: python-jose напрямую, как было до TokenCodec
+    signing_key = key_set.signing_key
+    verification_key = key_set.verification_key(key_set.signing_kid)
+    headers = {"kid": key_set.signing_kid} if key_set.signing_kid else None
+    token = jwt.encode(claims, signing_key, algorithm=algorithm, headers=headers)
+    results["jose-direct"] = {
+        "encode_ops": ops_per_sec(lambda: jwt.encode(claims, signing_key, algorithm=algorithm, headers=headers), number),
+        "decode_ops": ops_per_sec(lambda: jwt.decode(token, verification_key, algorithms=[algorithm]), number),
+    }
+
+    for backend in backends:
+        codec = TokenCodec(key_set, backend)
+        token = codec.encode(claims)
+        # Токены совместимы между бэкендами и с python-jose
+        assert jwt.decode(token, verification_key, algorithms=[algorithm])["sub"] == claims["sub"]
+        results[f"codec-{backend.name}"] = {
+            "encode_ops": ops_per_sec(lambda: codec.encode(claims), number),
+            "decode_ops": ops_per_sec(lambda: codec.decode(token), number),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JWT codec micro-benchmark")
+    parser.add_argument("--algorithm", default="HS256", choices=["HS256", "RS256", "ES256"])
+    parser.add_argument("--number", type=int, default=5000)
+    parser.add_argument("--output", help="путь для JSON с результатами")
+    args = parser.parse_args()
+
+    results = run(args.algorithm, args.number)
+    print(f"{'implementation':<20}{'encode ops/s':>16}{'decode ops/s':>16}")
+    for name, result in results.items():
+        print(f"{name:<20}{result['encode_ops']:>16.1f}{result['decode_ops']:>16.1f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"algorithm": args.algorithm, "number": args.number, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
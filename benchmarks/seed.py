@@ -0,0 +1,131 @@
+import random
+import secrets
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.crud.bulk import chunked
+from app.crud.refresh_token import hash_token
+from app.database.base import Base as TokenBase
+from app.model.base import Base
+from app.model.permission import Permission
+from app.model.refresh_token import RefreshToken
+from app.model.role import Role
+from app.model.role_hierarchy import RoleClosure
+from app.model.role_permission import RolePermission
+from app.model.user import User
+from app.model.user_role import UserRole
+from app.services.password_service import hash_password
+
+BENCHMARK_PASSWORD = "benchmark-password"
+ADMIN_EMAIL = "bench-admin@example.com"
+
+
+@dataclass
+class SeedConfig:
+    users: int = 1000
+    roles: int = 10
+    permissions: int = 50
+    tokens_per_user: int = 2
+    revoked_ratio: float = 0.5
+    seed: int = 42
+
+
+@dataclass
+class SeedResult:
+    admin_email: str = ADMIN_EMAIL
+    user_emails: List[str] = field(default_factory=list)
+    user_ids: List[uuid.UUID] = field(default_factory=list)
+    role_ids: List[uuid.UUID] = field(default_factory=list)
+    permission_ids: List[uuid.UUID] = field(default_factory=list)
+
+
+async def reset_schema(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(TokenBase.metadata.drop_all)
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(TokenBase.metadata.create_all)
+
+
+async def _insert(db: AsyncSession, model, rows: List[dict]) -> None:
+    for chunk in chunked(rows, 2000):
+        await db.execute(pg_insert(model).values(chunk).on_conflict_do_nothing())
+
+
+async def seed(db: AsyncSession, config: SeedConfig) -> SeedResult:
+    rnd = random.Random(config.seed)
+    # Один хеш на всех пользователей: сидирование не должно упираться в CPU.
+    # Хеш с текущими настройками, чтобы вход не запускал перехеширование
+    hashed_password = await hash_password(BENCHMARK_PASSWORD)
+    now = datetime.utcnow()
+    result = SeedResult()
+
+    roles = [{"id": uuid.uuid4(), "name": "admin", "description": "benchmark admin"}]
+    roles += [
+        {"id": uuid.uuid4(), "name": f"bench-role-{i}", "description": None}
+        for i in range(max(config.roles - 1, 0))
+    ]
+    resources = ["users", "roles", "permissions", "reports", "billing"]
+    permissions = [{"id": uuid.uuid4(), "resource": "users", "action": "read", "description": None}]
+    permissions += [
+        {"id": uuid.uuid4(), "resource": resources[i % len(resources)], "action": f"action-{i}", "description": None}
+        for i in range(max(config.permissions - 1, 0))
+    ]
+    result.role_ids = [r["id"] for r in roles]
+    result.permission_ids = [p["id"] for p in permissions]
+
+    role_permissions = [{"role_id": roles[0]["id"], "permission_id": permissions[0]["id"]}]
+    for role in roles:
+        for perm in rnd.sample(permissions, min(5, len(permissions))):
+            role_permissions.append({"role_id": role["id"], "permission_id": perm["id"]})
+
+    users = [{
+        "id": uuid.uuid4(), "first_name": "Bench", "last_name": "Admin", "middle_name": None,
+        "email": ADMIN_EMAIL, "hashed_password": hashed_password, "is_active": True,
+        "created_at": now, "updated_at": now,
+    }]
+    for i in range(config.users):
+        email = f"bench-user-{i}@example.com"
+        result.user_emails.append(email)
+        created_at = now - timedelta(seconds=config.users - i)
+        users.append({
+            "id": uuid.uuid4(), "first_name": "Bench", "last_name": f"User{i}", "middle_name": None,
+            "email": email, "hashed_password": hashed_password, "is_active": True,
+            "created_at": created_at, "updated_at": created_at,
+        })
+
+    result.user_ids = [u["id"] for u in users[1:]]
+
+    user_roles = [{"user_id": users[0]["id"], "role_id": roles[0]["id"]}]
+    for user in users[1:]:
+        for role in rnd.sample(roles[1:] or roles, min(2, len(roles[1:] or roles))):
+            user_roles.append({"user_id": user["id"], "role_id": role["id"]})
+
+    # У каждого пользователя есть хотя бы один активный токен, остальные частично отозваны
+    tokens = []
+    for user in users:
+        for n in range(config.tokens_per_user):
+            tokens.append({
+                "id": uuid.uuid4(),
+                "token_hash": hash_token(secrets.token_urlsafe(32)),
+                "user_id": user["id"],
+                "created_at": now,
+                "expires_at": now + timedelta(days=7),
+                "revoked": n > 0 and rnd.random() < config.revoked_ratio,
+            })
+
+    await _insert(db, Role, roles)
+    # Строки замыкания (role, role): без них пользователи не получают даже собственные роли
+    await _insert(db, RoleClosure, [{"descendant_id": r["id"], "ancestor_id": r["id"], "paths": 1} for r in roles])
+    await _insert(db, Permission, permissions)
+    await _insert(db, RolePermission, role_permissions)
+    await _insert(db, User, users)
+    await _insert(db, UserRole, user_roles)
+    await _insert(db, RefreshToken, tokens)
+    await db.commit()
+    return result
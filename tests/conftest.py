@@ -0,0 +1,33 @@
+import asyncio
+import os
+
+import pytest
+
+# Модули с тестами на БД пропускаются без TEST_DATABASE_URL; настройки приложения
+# читаются при импорте, поэтому переменные выставляются до импорта app
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ.setdefault("DATABASE_URL", TEST_DATABASE_URL)
+    os.environ.setdefault("SECRET_KEY", "test")
+
+
+@pytest.fixture
+def run_db():
+    # Выполняет сценарий с сессией на заново созданной схеме (база должна быть отдельной)
+    def run(scenario) -> None:
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+        from benchmarks.seed import reset_schema
+
+        async def main():
+            engine = create_async_engine(TEST_DATABASE_URL)
+            try:
+                await reset_schema(engine)
+                session_factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+                async with session_factory() as db:
+                    await scenario(db)
+            finally:
+                await engine.dispose()
+
+        asyncio.run(main())
+
+    return run
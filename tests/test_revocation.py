@@ -0,0 +1,101 @@
+"""Список отзыва в памяти против состояния refresh_tokens.
+
+Нужен PostgreSQL в TEST_DATABASE_URL (см. tests/test_role_hierarchy.py).
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+if not os.environ.get("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.refresh_token import CRUDRefreshToken
+from app.model.user import User
+from app.services.revocation_service import revocation_list
+
+
+async def create_user(db: AsyncSession, email: str) -> User:
+    user = User(first_name="Test", last_name="User", email=email, hashed_password="x", is_active=True)
+    db.add(user)
+    await db.commit()
+    return user
+
+
+async def loaded(db: AsyncSession) -> None:
+    # Состояние, которое получит воркер после (пере)подключения слушателя
+    revocation_list.ready = False
+    await revocation_list.load(db)
+
+
+def run_ready(run_db, scenario) -> None:
+    async def wrapped(db):
+        await revocation_list.load(db)
+        try:
+            await scenario(db)
+        finally:
+            revocation_list.ready = False
+
+    run_db(wrapped)
+
+
+def test_last_token_revocation_logs_user_out(run_db):
+    async def scenario(db):
+        user = await create_user(db, "user@example.com")
+        first = await CRUDRefreshToken.create(db, "first", user.id)
+        second = await CRUDRefreshToken.create(db, "second", user.id)
+        assert await CRUDRefreshToken.has_active_token(db, user.id)
+
+        await CRUDRefreshToken.revoke_token(db, first)
+        assert not await CRUDRefreshToken.is_token_active(db, "first")
+        assert await CRUDRefreshToken.is_token_active(db, "second")
+        assert await CRUDRefreshToken.has_active_token(db, user.id)
+
+        await CRUDRefreshToken.revoke_token(db, second)
+        assert not await CRUDRefreshToken.has_active_token(db, user.id)
+        await loaded(db)
+        assert not await CRUDRefreshToken.has_active_token(db, user.id)
+        assert not await CRUDRefreshToken.is_token_active(db, "second")
+
+        # Новый вход снимает отметку
+        await CRUDRefreshToken.create(db, "third", user.id)
+        assert await CRUDRefreshToken.has_active_token(db, user.id)
+        await loaded(db)
+        assert await CRUDRefreshToken.has_active_token(db, user.id)
+
+    run_ready(run_db, scenario)
+
+
+def test_recently_expired_session_is_loaded_as_logged_out(run_db):
+    async def scenario(db):
+        recent = await create_user(db, "recent@example.com")
+        old = await create_user(db, "old@example.com")
+        now = datetime.utcnow()
+        await CRUDRefreshToken.create(db, "recent", recent.id, expires_at=now - timedelta(minutes=1))
+        await CRUDRefreshToken.create(db, "old", old.id, expires_at=now - timedelta(days=1))
+
+        await loaded(db)
+        assert not await CRUDRefreshToken.has_active_token(db, recent.id)
+        # Access токены, выданные до истечения сессии, уже истекли — запись не нужна
+        assert old.id not in revocation_list.logged_out_users
+
+    run_ready(run_db, scenario)
+
+
+def test_expired_entries_are_pruned(run_db):
+    async def scenario(db):
+        user = await create_user(db, "user@example.com")
+        token = await CRUDRefreshToken.create(db, "token", user.id, expires_at=datetime.utcnow() + timedelta(seconds=30))
+        await CRUDRefreshToken.revoke_token(db, token)
+        assert revocation_list.is_token_revoked(token.token_hash)
+        assert user.id in revocation_list.logged_out_users
+
+        revocation_list.prune(time.time() + 60)
+        assert not revocation_list.is_token_revoked(token.token_hash)
+        revocation_list.prune(time.time() + revocation_list.logout_window() + 1)
+        assert user.id not in revocation_list.logged_out_users
+
+    run_ready(run_db, scenario)
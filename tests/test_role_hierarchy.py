@@ -0,0 +1,226 @@
+"""Замыкание иерархии ролей против пересчёта с нуля по role_inheritance.
+
+Нужен PostgreSQL: TEST_DATABASE_URL=postgresql+asyncpg://.../auth_test. База должна
+быть отдельной — схема пересоздаётся перед каждым тестом.
+"""
+import os
+import random
+import uuid
+from collections import Counter
+from typing import Dict, List
+
+import pytest
+
+if not os.environ.get("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.crud.role import CRUDRole
+from app.crud.role_hierarchy import CRUDRoleHierarchy
+from app.model.role_hierarchy import RoleClosure, RoleInheritance
+from app.model.user import User
+from app.model.user_role import UserRole
+from app.schemas.role import RoleCreate
+from app.services.permissions_service import load_user_role_ids
+
+
+async def create_roles(db: AsyncSession, names: List[str]) -> Dict[str, uuid.UUID]:
+    roles = {}
+    for name in names:
+        role = await CRUDRole.create(db, RoleCreate(name=name))
+        roles[name] = role.id
+    return roles
+
+
+async def link(db: AsyncSession, roles: Dict[str, uuid.UUID], child: str, parent: str) -> str:
+    return await CRUDRoleHierarchy.add_parent(db, roles[child], roles[parent])
+
+
+async def unlink(db: AsyncSession, roles: Dict[str, uuid.UUID], child: str, parent: str) -> bool:
+    return await CRUDRoleHierarchy.remove_parent(db, roles[child], roles[parent])
+
+
+async def closure(db: AsyncSession) -> Counter:
+    result = await db.execute(select(RoleClosure.descendant_id, RoleClosure.ancestor_id, RoleClosure.paths))
+    return Counter({(d, a): paths for d, a, paths in result.all()})
+
+
+async def recomputed_closure(db: AsyncSession) -> Counter:
+    # Число путей descendant → ancestor по рёбрам child → parent, включая путь длины 0
+    role_ids = (await db.execute(select(RoleClosure.descendant_id).distinct())).scalars().all()
+    edges = (await db.execute(select(RoleInheritance.child_id, RoleInheritance.parent_id))).all()
+    parents: Dict[uuid.UUID, List[uuid.UUID]] = {role_id: [] for role_id in role_ids}
+    for child_id, parent_id in edges:
+        parents[child_id].append(parent_id)
+
+    memo: Dict[uuid.UUID, Counter] = {}
+
+    def paths_from(role_id: uuid.UUID) -> Counter:
+        if role_id not in memo:
+            counts = Counter({role_id: 1})
+            for parent_id in parents[role_id]:
+                counts.update(paths_from(parent_id))
+            memo[role_id] = counts
+        return memo[role_id]
+
+    return Counter({
+        (role_id, ancestor_id): paths
+        for role_id in role_ids
+        for ancestor_id, paths in paths_from(role_id).items()
+    })
+
+
+async def assert_consistent(db: AsyncSession) -> None:
+    assert await closure(db) == await recomputed_closure(db)
+
+
+async def ancestor_names(db: AsyncSession, roles: Dict[str, uuid.UUID], name: str) -> set:
+    return {role.name for role in await CRUDRoleHierarchy.get_ancestors(db, roles[name])}
+
+
+def test_create_adds_self_row(run_db):
+    async def scenario(db):
+        roles = await create_roles(db, ["a", "b"])
+        assert await closure(db) == Counter({(roles["a"], roles["a"]): 1, (roles["b"], roles["b"]): 1})
+
+    run_db(scenario)
+
+
+def test_chain(run_db):
+    async def scenario(db):
+        roles = await create_roles(db, ["a", "b", "c"])
+        assert await link(db, roles, "b", "a") == "added"
+        assert await link(db, roles, "c", "b") == "added"
+        await assert_consistent(db)
+        assert await ancestor_names(db, roles, "c") == {"a", "b"}
+
+        # Ребро в середине цепочки: c теряет обоих предков
+        assert await unlink(db, roles, "c", "b")
+        await assert_consistent(db)
+        assert await ancestor_names(db, roles, "c") == set()
+        assert await ancestor_names(db, roles, "b") == {"a"}
+
+    run_db(scenario)
+
+
+def test_diamond_counts_paths(run_db):
+    async def scenario(db):
+        roles = await create_roles(db, ["top", "left", "right", "bottom"])
+        await link(db, roles, "left", "top")
+        await link(db, roles, "right", "top")
+        await link(db, roles, "bottom", "left")
+        await link(db, roles, "bottom", "right")
+        await assert_consistent(db)
+        assert (await closure(db))[(roles["bottom"], roles["top"])] == 2
+
+        # Один из двух путей снят: top всё ещё предок bottom
+        assert await unlink(db, roles, "bottom", "left")
+        await assert_consistent(db)
+        assert (await closure(db))[(roles["bottom"], roles["top"])] == 1
+        assert await ancestor_names(db, roles, "bottom") == {"right", "top"}
+
+        assert await unlink(db, roles, "bottom", "right")
+        await assert_consistent(db)
+        assert await ancestor_names(db, roles, "bottom") == set()
+
+    run_db(scenario)
+
+
+def test_diamond_closed_from_above(run_db):
+    async def scenario(db):
+        # Нижние рёбра добавлены раньше верхних: пути считаются через уже существующие строки
+        roles = await create_roles(db, ["top", "left", "right", "bottom", "leaf"])
+        await link(db, roles, "leaf", "bottom")
+        await link(db, roles, "bottom", "left")
+        await link(db, roles, "bottom", "right")
+        await link(db, roles, "left", "top")
+        await link(db, roles, "right", "top")
+        await assert_consistent(db)
+        assert (await closure(db))[(roles["leaf"], roles["top"])] == 2
+
+        assert await unlink(db, roles, "right", "top")
+        await assert_consistent(db)
+        assert (await closure(db))[(roles["leaf"], roles["top"])] == 1
+
+    run_db(scenario)
+
+
+def test_rejected_edges(run_db):
+    async def scenario(db):
+        roles = await create_roles(db, ["a", "b", "c"])
+        await link(db, roles, "b", "a")
+        await link(db, roles, "c", "b")
+        assert await link(db, roles, "a", "c") == "cycle"
+        assert await link(db, roles, "a", "a") == "cycle"
+        assert await link(db, roles, "c", "b") == "exists"
+        assert await CRUDRoleHierarchy.add_parent(db, roles["a"], uuid.uuid4()) == "role_not_found"
+        assert not await unlink(db, roles, "a", "c")
+        await assert_consistent(db)
+
+    run_db(scenario)
+
+
+def test_delete_middle_role_detaches_it(run_db):
+    async def scenario(db):
+        roles = await create_roles(db, ["top", "left", "right", "bottom", "leaf"])
+        await link(db, roles, "left", "top")
+        await link(db, roles, "right", "top")
+        await link(db, roles, "bottom", "left")
+        await link(db, roles, "bottom", "right")
+        await link(db, roles, "leaf", "bottom")
+
+        await CRUDRole.delete(db, await CRUDRole.get(db, roles["left"]))
+        await assert_consistent(db)
+        assert await ancestor_names(db, roles, "leaf") == {"bottom", "right", "top"}
+        assert (await closure(db))[(roles["leaf"], roles["top"])] == 1
+
+        await CRUDRole.delete(db, await CRUDRole.get(db, roles["bottom"]))
+        await assert_consistent(db)
+        assert await ancestor_names(db, roles, "leaf") == set()
+
+    run_db(scenario)
+
+
+def test_random_dag_matches_recomputed_closure(run_db):
+    async def scenario(db):
+        rnd = random.Random(7)
+        names = [f"r{i}" for i in range(12)]
+        roles = await create_roles(db, names)
+        # Родитель всегда с меньшим номером — граф ацикличен при любом порядке вставки
+        candidates = [(names[c], names[p]) for c in range(len(names)) for p in range(c) if rnd.random() < 0.35]
+        rnd.shuffle(candidates)
+        for child, parent in candidates:
+            assert await link(db, roles, child, parent) == "added"
+            await assert_consistent(db)
+
+        rnd.shuffle(candidates)
+        for child, parent in candidates[: len(candidates) // 2]:
+            assert await unlink(db, roles, child, parent)
+            await assert_consistent(db)
+
+        for name in rnd.sample(names, 3):
+            await CRUDRole.delete(db, await CRUDRole.get(db, roles[name]))
+            await assert_consistent(db)
+
+    run_db(scenario)
+
+
+def test_user_gets_inherited_roles(run_db):
+    async def scenario(db):
+        roles = await create_roles(db, ["a", "b", "c", "other"])
+        await link(db, roles, "b", "a")
+        await link(db, roles, "c", "b")
+        user = User(
+            first_name="Test", last_name="User", email="user@example.com",
+            hashed_password="x", is_active=True,
+        )
+        db.add(user)
+        await db.flush()
+        db.add(UserRole(user_id=user.id, role_id=roles["c"]))
+        await db.commit()
+
+        assert await load_user_role_ids(db, user.id) == {roles["a"], roles["b"], roles["c"]}
+
+    run_db(scenario)
@@ -0,0 +1,62 @@
+"""CRUD ролей: версии авторизации пользователей роли после commit.
+
+Нужен PostgreSQL в TEST_DATABASE_URL (см. tests/test_role_hierarchy.py).
+"""
+import os
+
+import pytest
+
+if not os.environ.get("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.role import CRUDRole
+from app.model.user import User
+from app.model.user_role import UserRole
+from app.schemas.role import RoleCreate, RoleUpdate
+from app.services.auth_service import authz_versions
+
+
+async def user_with_role(db: AsyncSession, name: str) -> tuple:
+    role = await CRUDRole.create(db, RoleCreate(name=name))
+    user = User(
+        first_name="Test", last_name="User", email=f"{name}@example.com",
+        hashed_password="x", is_active=True,
+    )
+    db.add(user)
+    await db.flush()
+    db.add(UserRole(user_id=user.id, role_id=role.id))
+    await db.commit()
+    return role, user
+
+
+def test_update_bumps_and_applies_authz_versions(run_db):
+    async def scenario(db):
+        role, user = await user_with_role(db, "editor")
+        before = user.authz_version
+
+        updated = await CRUDRole.update(db, role, RoleUpdate(description="Edits content"))
+        assert updated.description == "Edits content"
+
+        await db.refresh(user)
+        assert user.authz_version == before + 1
+        # Версия применена к реестру воркера сразу после commit
+        assert authz_versions.get(user.id) == user.authz_version
+
+    run_db(scenario)
+
+
+def test_delete_bumps_and_applies_authz_versions(run_db):
+    async def scenario(db):
+        role, user = await user_with_role(db, "viewer")
+        before = user.authz_version
+
+        await CRUDRole.delete(db, role)
+
+        await db.refresh(user)
+        assert user.authz_version == before + 1
+        assert authz_versions.get(user.id) == user.authz_version
+        assert await CRUDRole.get(db, role.id) is None
+
+    run_db(scenario)
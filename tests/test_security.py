@@ -0,0 +1,168 @@
+import base64
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from jose import JWTError, jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError
+
+from app.core.security import HmacBackend, JoseBackend, KeySet, TokenCodec
+
+SECRET = "test-secret"
+CLAIMS = {"sub": "user@example.com", "uid": "4b0e3b6c-7f0e-4a39-9d64-2a1c7f6f0b11", "roles": ["user"]}
+
+CASES = [
+    ("HS256", "jose"), ("HS256", "hmac"), ("HS256", "pyjwt"),
+    ("HS512", "hmac"),
+    ("RS256", "jose"), ("RS256", "pyjwt"),
+    ("ES256", "jose"), ("ES256", "pyjwt"),
+]
+
+
+def write_private_key(algorithm: str, path) -> None:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    if algorithm.startswith("RS"):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        key = ec.generate_private_key(ec.SECP256R1())
+    path.write_bytes(key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ))
+
+
+def make_backend(name: str):
+    if name == "pyjwt":
+        pytest.importorskip("jwt")
+        from app.core.security import PyJWTBackend
+        return PyJWTBackend()
+    return {"jose": JoseBackend, "hmac": HmacBackend}[name]()
+
+
+@pytest.fixture(params=CASES, ids=lambda case: f"{case[0]}-{case[1]}")
+def codec(request, tmp_path) -> TokenCodec:
+    algorithm, backend = request.param
+    if algorithm.startswith("HS"):
+        key_set = KeySet(algorithm, SECRET)
+    else:
+        write_private_key(algorithm, tmp_path / "k1.pem")
+        key_set = KeySet(algorithm, "", keys_dir=str(tmp_path))
+    return TokenCodec(key_set, make_backend(backend))
+
+
+def jose_encode(codec: TokenCodec, claims: dict, **kwargs) -> str:
+    key_set = codec.key_set
+    headers = {"kid": key_set.signing_kid} if key_set.signing_kid else None
+    return jwt.encode(claims, key_set.signing_key, algorithm=codec.algorithm, headers=headers, **kwargs)
+
+
+def jose_decode(codec: TokenCodec, token: str) -> dict:
+    key_set = codec.key_set
+    return jwt.decode(token, key_set.verification_key(key_set.signing_kid), algorithms=[codec.algorithm])
+
+
+def b64(data: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+
+
+def future(**delta) -> int:
+    return int(time.time() + timedelta(**delta).total_seconds())
+
+
+def test_round_trip(codec):
+    claims = {**CLAIMS, "exp": datetime.now(timezone.utc) + timedelta(minutes=5)}
+    token = codec.encode(claims)
+    decoded = codec.decode(token)
+    assert decoded["sub"] == CLAIMS["sub"]
+    assert decoded["roles"] == CLAIMS["roles"]
+    assert decoded["exp"] == jose_decode(codec, token)["exp"]
+
+
+def test_codec_token_accepted_by_jose(codec):
+    token = codec.encode({**CLAIMS, "exp": future(minutes=5)})
+    assert jose_decode(codec, token) == codec.decode(token)
+
+
+def test_jose_token_accepted_by_codec(codec):
+    claims = {**CLAIMS, "exp": future(minutes=5)}
+    assert codec.decode(jose_encode(codec, claims)) == claims
+
+
+def test_header_is_precomputed(codec):
+    token = codec.encode(CLAIMS)
+    header = jwt.get_unverified_header(token)
+    assert header["alg"] == codec.algorithm
+    assert header.get("kid") == codec.key_set.signing_kid
+
+
+def test_tampered_payload_rejected(codec):
+    header, _, signature = codec.encode(CLAIMS).split(".")
+    forged = b64({**CLAIMS, "roles": ["admin"]})
+    with pytest.raises(JWTError):
+        codec.decode(f"{header}.{forged}.{signature}")
+
+
+def test_tampered_signature_rejected(codec):
+    header, payload, signature = codec.encode(CLAIMS).split(".")
+    flipped = ("A" if signature[0] != "A" else "B") + signature[1:]
+    with pytest.raises(JWTError):
+        codec.decode(f"{header}.{payload}.{flipped}")
+
+
+@pytest.mark.parametrize("token", ["", "abc", "a.b", "a.b.c.d", "!!!.!!!.!!!"])
+def test_malformed_token_rejected(codec, token):
+    with pytest.raises(JWTError):
+        codec.decode(token)
+
+
+def test_other_algorithm_rejected(codec):
+    # Подпись HS* открытым ключом (или секретом) не должна проходить при другом alg
+    other = "HS384" if codec.algorithm != "HS384" else "HS256"
+    key = codec.key_set.signing_key if codec.key_set.symmetric else json.dumps(
+        codec.key_set.verification_key(codec.key_set.signing_kid))
+    headers = {"kid": codec.key_set.signing_kid} if codec.key_set.signing_kid else None
+    token = jwt.encode(CLAIMS, key, algorithm=other, headers=headers)
+    with pytest.raises(JWTError, match="alg"):
+        codec.decode(token)
+
+
+def test_alg_none_rejected(codec):
+    _, payload, _ = codec.encode(CLAIMS).split(".")
+    header = b64({"alg": "none", "typ": "JWT"})
+    with pytest.raises(JWTError):
+        codec.decode(f"{header}.{payload}.")
+
+
+def test_expired_token_rejected(codec):
+    token = codec.encode({**CLAIMS, "exp": future(minutes=-1)})
+    with pytest.raises(ExpiredSignatureError):
+        codec.decode(token)
+    with pytest.raises(ExpiredSignatureError):
+        jose_decode(codec, token)
+
+
+def test_not_yet_valid_token_rejected(codec):
+    token = codec.encode({**CLAIMS, "nbf": future(minutes=5)})
+    with pytest.raises(JWTClaimsError):
+        codec.decode(token)
+    with pytest.raises(JWTClaimsError):
+        jose_decode(codec, token)
+
+
+@pytest.mark.parametrize("claim", ["exp", "nbf"])
+def test_non_numeric_time_claim_rejected(codec, claim):
+    with pytest.raises(JWTClaimsError):
+        codec.decode(codec.encode({**CLAIMS, claim: "soon"}))
+
+
+def test_unknown_kid_rejected(codec):
+    if codec.key_set.symmetric:
+        pytest.skip("HS* tokens carry no kid")
+    _, payload, signature = codec.encode(CLAIMS).split(".")
+    header = b64({"alg": codec.algorithm, "typ": "JWT", "kid": "missing"})
+    with pytest.raises(JWTError, match="Unknown key id"):
+        codec.decode(f"{header}.{payload}.{signature}")